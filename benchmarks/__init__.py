@@ -0,0 +1 @@
+"""Surge集成基准测试（本地模拟Surge HTTP API）"""
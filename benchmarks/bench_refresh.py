@@ -0,0 +1,203 @@
+"""刷新周期基准测试（基于本地模拟Surge API）
+
+用法（在仓库根目录、已安装Home Assistant的环境中运行）：
+    python -m benchmarks.bench_refresh
+    python -m benchmarks.bench_refresh --groups 5 50 500 --cycles 5 --latency 0.01 --json
+    python -m benchmarks.bench_refresh --replay capture.jsonl.gz  # 回放真实设备录制
+
+每个场景输出：每轮请求数、每轮耗时、事件循环延迟（p95/最大）、内存峰值。
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import List
+
+import aiohttp
+
+from custom_components.Surge import SurgeFleetScheduler
+from custom_components.Surge.const import (
+    CONF_UPDATE_INTERVAL,
+    DEFAULT_UPDATE_INTERVAL,
+    FLEET_MAX_CONCURRENT_REQUESTS,
+    FLEET_MAX_REQUESTS_PER_DEVICE,
+)
+from custom_components.Surge.coordinator import async_fetch_snapshot
+from custom_components.Surge.surge_api import SurgeAPIClient
+
+from .fake_surge_server import FakeSurgeConfig, FakeSurgeServer
+from .replay_server import ReplaySurgeServer
+
+DEFAULT_GROUP_SCENARIOS = [5, 20, 50, 100, 200, 500]
+LAG_PROBE_INTERVAL = 0.005  # 事件循环延迟探测间隔（秒）
+
+
+@dataclass
+class ScenarioResult:
+    groups: int
+    policies_per_group: int
+    requests_per_cycle: float
+    cycle_time_ms: float  # 每轮耗时中位数
+    cycle_time_max_ms: float
+    loop_lag_p95_ms: float
+    loop_lag_max_ms: float
+    memory_peak_kb: float
+    errors: int
+
+
+class LoopLagProbe:
+    """周期性sleep，记录实际唤醒时间与预期的偏差（即事件循环延迟）"""
+
+    def __init__(self, interval: float = LAG_PROBE_INTERVAL) -> None:
+        self._interval = interval
+        self._task = None
+        self.samples: List[float] = []
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+async def refresh_cycle(client: SurgeAPIClient) -> int:
+    """执行一次与设备协调器完全相同的快照获取，返回失败部分数"""
+    snapshot = await async_fetch_snapshot(client)
+    failed = sum(1 for state in snapshot.features.values() if state is None)
+    failed += sum(1 for state in snapshot.policy_groups.values() if state is None)
+    failed += sum(
+        1
+        for part in (snapshot.current_profile, snapshot.outbound_mode, snapshot.traffic)
+        if part is None
+    )
+    return failed
+
+
+async def run_scenario(
+    server, cycles: int, api_key: str, interval: int = DEFAULT_UPDATE_INTERVAL
+) -> ScenarioResult:
+    """server为FakeSurgeServer或ReplaySurgeServer；interval为模拟的刷新间隔（决定请求超时）"""
+    port = await server.start()
+    probe = LoopLagProbe()
+    cycle_times: List[float] = []
+    errors = 0
+
+    async with aiohttp.ClientSession() as session:
+        # 与SurgeFleetScheduler.async_acquire_client相同的并发上限和超时
+        client = SurgeAPIClient(
+            host="127.0.0.1",
+            port=port,
+            api_key=api_key,
+            session=session,
+            request_semaphore=asyncio.Semaphore(FLEET_MAX_CONCURRENT_REQUESTS),
+            max_concurrent_requests=FLEET_MAX_REQUESTS_PER_DEVICE,
+            request_timeout=SurgeFleetScheduler._request_timeout(
+                {CONF_UPDATE_INTERVAL: interval}
+            ),
+        )
+        # 预热一轮（建立连接），不计入统计
+        await refresh_cycle(client)
+        server.reset_counters()
+
+        tracemalloc.start()
+        probe.start()
+        for _ in range(cycles):
+            started = time.perf_counter()
+            errors += await refresh_cycle(client)
+            cycle_times.append(time.perf_counter() - started)
+        await probe.stop()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    await server.stop()
+    lags = sorted(probe.samples) or [0.0]
+    return ScenarioResult(
+        groups=server.groups,
+        policies_per_group=server.policies_per_group,
+        requests_per_cycle=server.total_requests / cycles,
+        cycle_time_ms=statistics.median(cycle_times) * 1000,
+        cycle_time_max_ms=max(cycle_times) * 1000,
+        loop_lag_p95_ms=lags[min(len(lags) - 1, int(len(lags) * 0.95))] * 1000,
+        loop_lag_max_ms=lags[-1] * 1000,
+        memory_peak_kb=peak / 1024,
+        errors=errors,
+    )
+
+
+def _print_table(results: List[ScenarioResult]) -> None:
+    header = (
+        f"{'groups':>7} {'policies':>8} {'req/cycle':>10} {'cycle(ms)':>10} "
+        f"{'max(ms)':>9} {'lag p95':>8} {'lag max':>8} {'mem(KB)':>9} {'errors':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.groups:>7} {r.policies_per_group:>8} {r.requests_per_cycle:>10.1f} "
+            f"{r.cycle_time_ms:>10.1f} {r.cycle_time_max_ms:>9.1f} {r.loop_lag_p95_ms:>8.2f} "
+            f"{r.loop_lag_max_ms:>8.2f} {r.memory_peak_kb:>9.0f} {r.errors:>7}"
+        )
+
+
+async def main(args: argparse.Namespace) -> List[ScenarioResult]:
+    if args.replay:
+        server = ReplaySurgeServer(args.replay, speed=args.speed)
+        return [await run_scenario(server, args.cycles, "replay", args.interval)]
+
+    results = []
+    for groups in args.groups:
+        config = FakeSurgeConfig(
+            groups=groups,
+            policies_per_group=args.policies,
+            latency=args.latency,
+            latency_jitter=args.jitter,
+            error_rate=args.error_rate,
+        )
+        results.append(
+            await run_scenario(FakeSurgeServer(config), args.cycles, config.api_key, args.interval)
+        )
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Surge集成刷新周期基准测试")
+    parser.add_argument("--groups", type=int, nargs="+", default=DEFAULT_GROUP_SCENARIOS)
+    parser.add_argument("--policies", type=int, default=10, help="每个策略组的策略数")
+    parser.add_argument("--cycles", type=int, default=3, help="每个场景的刷新轮数")
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=DEFAULT_UPDATE_INTERVAL,
+        help="模拟的刷新间隔（秒，决定请求超时）",
+    )
+    parser.add_argument("--latency", type=float, default=0.005, help="单请求延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟随机波动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟500错误的概率")
+    parser.add_argument("--replay", help="使用录制文件回放（忽略规模/延迟参数）")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放速度倍数")
+    parser.add_argument("--json", action="store_true", help="以JSON输出（便于对比回归）")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    scenario_results = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps([asdict(result) for result in scenario_results], indent=2))
+    else:
+        _print_table(scenario_results)
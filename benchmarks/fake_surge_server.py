@@ -0,0 +1,229 @@
+"""本地模拟Surge HTTP API服务（用于基准测试，无需真实设备）"""
+
+import asyncio
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+FEATURES = ["mitm", "capture", "rewrite", "scripting", "system_proxy", "enhanced_mode"]
+
+
+@dataclass
+class FakeSurgeConfig:
+    """模拟设备参数（延迟/错误率/配置规模均可调）"""
+
+    groups: int = 20  # 策略组数量
+    policies_per_group: int = 10  # 每个策略组的策略数量
+    profiles: int = 3  # 配置数量
+    modules: int = 5  # 模块数量
+    dns_records: int = 200  # DNS缓存条数
+    latency: float = 0.005  # 每个请求的基础延迟（秒）
+    latency_jitter: float = 0.0  # 延迟随机波动（秒）
+    error_rate: float = 0.0  # 返回500的概率（0~1）
+    api_key: str = "bench"
+    seed: Optional[int] = 0  # 随机种子（None则不固定）
+
+
+class FakeSurgeServer:
+    """实现SurgeAPIClient使用的/v1接口，并统计请求次数"""
+
+    def __init__(self, config: FakeSurgeConfig) -> None:
+        self.config = config
+        self.requests: Counter = Counter()  # 按接口族统计请求次数
+        self._random = random.Random(config.seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+        self._profiles = [f"Profile {i}" for i in range(config.profiles)]
+        self._current_profile = self._profiles[0]
+        self._outbound = "rule"
+        self._features: Dict[str, bool] = {feature: False for feature in FEATURES}
+        self._groups: Dict[str, List[str]] = {
+            f"Group {g}": [f"Policy {g}-{p}" for p in range(config.policies_per_group)]
+            for g in range(config.groups)
+        }
+        self._selected: Dict[str, str] = {
+            name: policies[0] for name, policies in self._groups.items() if policies
+        }
+        self._modules: Dict[str, bool] = {f"Module {m}": False for m in range(config.modules)}
+        self._dns_cache = [
+            {
+                "domain": f"host{i}.example.com",
+                "data": [f"10.0.{i // 256 % 256}.{i % 256}"],
+                "server": f"udp://223.5.5.{i % 2 + 5}",
+                "timeCost": round(self._random.uniform(0.005, 0.2), 4),
+                "expiresTime": 1700000000 + i,
+            }
+            for i in range(config.dns_records)
+        ]
+        self._upload = 0
+        self._download = 0
+
+    @property
+    def groups(self) -> int:
+        return self.config.groups
+
+    @property
+    def policies_per_group(self) -> int:
+        return self.config.policies_per_group
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    # ------------------------------ 生命周期 ------------------------------
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """启动服务，返回实际监听端口（port=0时自动分配）"""
+        app = web.Application(middlewares=[self._middleware])
+        app.add_routes(
+            [
+                web.get("/v1/profiles", self._get_profiles),
+                web.get("/v1/profiles/current", self._get_current_profile),
+                web.post("/v1/profiles/switch", self._switch_profile),
+                web.post("/v1/profiles/reload", self._reload_profile),
+                web.get("/v1/features/{feature}", self._get_feature),
+                web.post("/v1/features/{feature}", self._set_feature),
+                web.get("/v1/outbound", self._get_outbound),
+                web.post("/v1/outbound", self._set_outbound),
+                web.get("/v1/policy_groups", self._get_policy_groups),
+                web.get("/v1/policy_groups/{group}", self._get_policy_group),
+                web.post("/v1/policy_groups/{group}/select", self._select_policy),
+                web.get("/v1/modules", self._get_modules),
+                web.post("/v1/modules", self._set_modules),
+                web.get("/v1/traffic", self._get_traffic),
+                web.get("/v1/dns", self._get_dns),
+                web.post("/v1/dns/flush", self._flush_dns),
+            ]
+        )
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+
+    # ------------------------------ 公共处理 ------------------------------
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        """统一处理：请求计数、认证、模拟延迟和错误"""
+        family = request.path.split("/")[2] if request.path.count("/") >= 2 else request.path
+        self.requests[family] += 1
+
+        delay = self.config.latency
+        if self.config.latency_jitter:
+            delay += self._random.uniform(0, self.config.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if request.headers.get("X-Key") != self.config.api_key:
+            return web.json_response({"error": "unauthorized"}, status=401)
+        if self.config.error_rate and self._random.random() < self.config.error_rate:
+            return web.json_response({"error": "simulated failure"}, status=500)
+        return await handler(request)
+
+    # ------------------------------ 配置管理 ------------------------------
+    async def _get_profiles(self, request: web.Request) -> web.Response:
+        return web.json_response({"profiles": self._profiles})
+
+    async def _get_current_profile(self, request: web.Request) -> web.Response:
+        # 与真实设备一致：返回配置全文，策略组越多响应体越大
+        lines = ["[Proxy Group]"]
+        lines.extend(
+            f"{name} = select, {', '.join(policies)}" for name, policies in self._groups.items()
+        )
+        return web.json_response(
+            {"profile_name": self._current_profile, "profile": "\n".join(lines)}
+        )
+
+    async def _switch_profile(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if body.get("name") not in self._profiles:
+            return web.json_response({"error": "profile not found"}, status=400)
+        self._current_profile = body["name"]
+        return web.json_response({})
+
+    async def _reload_profile(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    # ------------------------------ 功能开关 ------------------------------
+    async def _get_feature(self, request: web.Request) -> web.Response:
+        feature = request.match_info["feature"]
+        if feature not in self._features:
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response({"enabled": self._features[feature]})
+
+    async def _set_feature(self, request: web.Request) -> web.Response:
+        feature = request.match_info["feature"]
+        if feature not in self._features:
+            return web.json_response({"error": "not found"}, status=404)
+        self._features[feature] = bool((await request.json()).get("enabled"))
+        return web.json_response({})
+
+    # ------------------------------ 出站模式 ------------------------------
+    async def _get_outbound(self, request: web.Request) -> web.Response:
+        return web.json_response({"mode": self._outbound})
+
+    async def _set_outbound(self, request: web.Request) -> web.Response:
+        self._outbound = (await request.json()).get("mode", self._outbound)
+        return web.json_response({})
+
+    # ------------------------------ 策略组 ------------------------------
+    async def _get_policy_groups(self, request: web.Request) -> web.Response:
+        return web.json_response({"groups": list(self._groups)})
+
+    async def _get_policy_group(self, request: web.Request) -> web.Response:
+        group = request.match_info["group"]
+        if group not in self._groups:
+            return web.json_response({"error": "group not found"}, status=404)
+        return web.json_response(
+            {"current": self._selected.get(group), "policies": self._groups[group]}
+        )
+
+    async def _select_policy(self, request: web.Request) -> web.Response:
+        group = request.match_info["group"]
+        policy = (await request.json()).get("policy")
+        if policy not in self._groups.get(group, []):
+            return web.json_response({"error": "policy not found"}, status=400)
+        self._selected[group] = policy
+        return web.json_response({})
+
+    # ------------------------------ 模块 ------------------------------
+    async def _get_modules(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "enabled": [name for name, enabled in self._modules.items() if enabled],
+                "available": list(self._modules),
+            }
+        )
+
+    async def _set_modules(self, request: web.Request) -> web.Response:
+        changes = await request.json()
+        if any(name not in self._modules for name in changes):
+            return web.json_response({"error": "module not found"}, status=400)
+        self._modules.update({name: bool(enabled) for name, enabled in changes.items()})
+        return web.json_response({})
+
+    # ------------------------------ 流量 ------------------------------
+    async def _get_traffic(self, request: web.Request) -> web.Response:
+        self._upload += self._random.randint(0, 4096)
+        self._download += self._random.randint(0, 16384)
+        return web.json_response({"upload": self._upload, "download": self._download})
+
+    # ------------------------------ DNS ------------------------------
+    async def _get_dns(self, request: web.Request) -> web.Response:
+        return web.json_response({"dnsCache": self._dns_cache, "local": []})
+
+    async def _flush_dns(self, request: web.Request) -> web.Response:
+        self._dns_cache = []
+        return web.json_response({})
@@ -0,0 +1,137 @@
+"""Surge API 回放服务（按录制文件重现真实设备的响应体大小和延迟）
+
+录制文件由 surge.start_capture / surge.stop_capture 服务生成。用法：
+    python -m benchmarks.replay_server capture.jsonl.gz --port 6171 --speed 1.0
+    python -m benchmarks.bench_refresh --replay capture.jsonl.gz
+"""
+
+import argparse
+import asyncio
+import json
+from collections import Counter, defaultdict
+from itertools import cycle
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+from custom_components.Surge.capture import load_capture
+
+
+class ReplaySurgeServer:
+    """按(方法, 接口)依次循环返回录制的响应，并按录制耗时延迟返回"""
+
+    def __init__(self, capture_path: str, speed: float = 1.0) -> None:
+        capture = load_capture(capture_path)
+        self.header: Dict[str, Any] = capture["header"]
+        self.speed = speed  # 回放速度倍数（2.0表示延迟减半）
+        self.requests: Counter = Counter()
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+        recorded: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self.oversized = 0  # 重新编码后仍长于原始字节数的响应数
+        for entry in capture["entries"]:
+            entry["body"] = self._encode_body(entry)
+            if len(entry["body"]) > entry["n"]:
+                self.oversized += 1
+            recorded[(entry["m"], entry["e"])].append(entry)
+        self._responses: Dict[Tuple[str, str], Iterator[Dict[str, Any]]] = {
+            key: cycle(entries) for key, entries in recorded.items()
+        }
+
+        # 从录制内容推算配置规模（供基准测试报告）
+        groups = self._first_body(recorded, ("GET", "policy_groups"), "groups") or []
+        self.groups = len(groups)
+        policies = [
+            len(self._first_body(recorded, ("GET", f"policy_groups/{name}"), "policies") or [])
+            for name in groups
+        ]
+        self.policies_per_group = round(sum(policies) / len(policies)) if policies else 0
+
+    @staticmethod
+    def _encode_body(entry: Dict[str, Any]) -> bytes:
+        """按原始字节数重建响应体：紧凑编码后用空白补齐（仍为合法JSON）
+
+        脱敏为等长替换，紧凑编码不会长于设备的原始响应；只有设备输出了
+        更短的数字写法等极少数情况会略长，此时无法在不破坏JSON的前提下截断。
+        """
+        if entry["b"] is None:
+            return b""
+        if isinstance(entry["b"], str):
+            body = entry["b"].encode()  # 非JSON响应按原文回放
+        else:
+            body = json.dumps(entry["b"], ensure_ascii=False, separators=(",", ":")).encode()
+        return body + b" " * (entry["n"] - len(body)) if len(body) < entry["n"] else body
+
+    @staticmethod
+    def _first_body(recorded, key: Tuple[str, str], field: str) -> Any:
+        for entry in recorded.get(key, []):
+            if isinstance(entry.get("b"), dict) and field in entry["b"]:
+                return entry["b"][field]
+        return None
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        app = web.Application()
+        app.router.add_route("*", "/v1/{endpoint:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.port = self._runner.addresses[0][1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        endpoint = request.match_info["endpoint"]
+        self.requests[endpoint.split("/")[0]] += 1
+        responses = self._responses.get((request.method, endpoint))
+        if responses is None:
+            return web.json_response({"error": "not recorded"}, status=404)
+
+        entry = next(responses)
+        await asyncio.sleep(entry["ms"] / 1000 / self.speed)
+        if entry["s"] == 0:
+            # 录制时连接失败：直接断开连接
+            request.transport.close()
+            return web.Response(status=503)
+
+        return web.Response(
+            body=entry["body"], status=entry["s"], content_type="application/json"
+        )
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = ReplaySurgeServer(args.capture, speed=args.speed)
+    port = await server.start(args.host, args.port)
+    print(
+        f"回放服务已启动：http://{args.host}:{port}/v1 "
+        f"（{server.header.get('entries', 0)}条记录，{server.groups}个策略组）"
+    )
+    if server.oversized:
+        print(f"注意：{server.oversized}条响应重新编码后长于原始字节数")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Surge API录制回放服务")
+    parser.add_argument("capture", help="录制文件路径（.jsonl.gz）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6171)
+    parser.add_argument("--speed", type=float, default=1.0, help="回放速度倍数")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
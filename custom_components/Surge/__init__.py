@@ -1,37 +1,247 @@
 """Surge Integration 初始化（适配Config Flow）"""
 
+import asyncio
 import logging
-from typing import Dict, Any
+import random
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.event import async_call_later
 
 from .const import (
+    API_CLIENT,
+    CLIENT_KEY,
     CONF_API_KEY,
     CONF_HOST,
     CONF_PORT,
     CONF_UPDATE_INTERVAL,
     CONF_USE_HTTPS,
     CONF_VERIFY_SSL,
+    DNS_CACHE,
     DOMAIN,
+    HISTORY_DIR,
+    HISTORY_LOG,
+    UPDATE_COORDINATOR,
     DEVICE_MANUFACTURER,
     DEVICE_MODEL,
     DEVICE_NAME,
+    FLEET_JITTER_RATIO,
+    FLEET_MAX_CONCURRENT_REQUESTS,
+    FLEET_MAX_REQUESTS_PER_DEVICE,
+    FLEET_SCHEDULER,
+    REQUEST_TIMEOUT,
 )
+from .coordinator import SurgeDataCoordinator
+from .dns import SurgeDNSCache
+from .history import SurgeHistoryLog
+from .services import async_finish_capture, async_setup_services
 from .surge_api import SurgeAPIClient, SurgeAPIError
 
 _LOGGER = logging.getLogger(__name__)
 
-# 全局存储键（用于传递API客户端和配置）
-API_CLIENT = "api_client"
-UPDATE_COORDINATOR = "update_coordinator"
+# 黄金分割比：依次分配的相位在[0, 1)内尽量均匀分布（设备数增长时无需重排）
+_GOLDEN_RATIO = 0.6180339887498949
+
+
+# ------------------------------ 多设备共享调度器 ------------------------------
+class _EntrySchedule:
+    """单个配置项的轮询计划（第k轮的基准时刻为 origin + k*interval）"""
+
+    __slots__ = ("interval", "origin", "cycle", "refreshers", "cancel", "lock")
+
+    def __init__(self, interval: float, origin: float) -> None:
+        self.interval = interval
+        self.origin = origin  # 第0轮的时刻（事件循环时间，已含相位）
+        self.cycle = 0
+        self.refreshers: List[Callable[[], Awaitable[None]]] = []
+        self.cancel: Optional[CALLBACK_TYPE] = None
+        self.lock = asyncio.Lock()  # 持有期间为一轮刷新（定时或手动）正在执行
+
+    def next_delay(self, now: float, jitter: float) -> float:
+        """距下一轮的时间：固定网格上的下一个时刻加本轮抖动（抖动不会逐轮累积）
+
+        事件循环卡顿错过的轮次直接跳过。
+        """
+        self.cycle = max(self.cycle + 1, int((now - self.origin) // self.interval) + 1)
+        return max(self.origin + (self.cycle + jitter) * self.interval - now, 0.0)
+
+
+class SurgeFleetScheduler:
+    """DOMAIN级共享调度器（所有配置项共用）
+
+    - 每个配置项分配一个在刷新间隔内错开的相位，每轮再叠加随机抖动，
+      避免所有设备在同一时刻集中轮询
+    - 所有API客户端共享一个全局并发请求上限，每台设备另有单设备上限，
+      请求超时短于刷新间隔（不可达的设备不会占满全局名额、拖慢其他设备）
+    - 指向同一设备（host:port）的配置项共享同一个API客户端
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.semaphore = asyncio.Semaphore(FLEET_MAX_CONCURRENT_REQUESTS)
+        self._clients: Dict[Tuple, SurgeAPIClient] = {}
+        self._client_refs: Dict[Tuple, int] = {}
+        self._schedules: Dict[str, _EntrySchedule] = {}
+        self._phase = 0.0
+
+    # ---------- 共享API客户端 ----------
+    @staticmethod
+    def _client_key(config_data: Dict[str, Any]) -> Tuple:
+        """同一设备的配置项使用相同的客户端键"""
+        return (
+            str(config_data[CONF_HOST]).strip().lower(),
+            int(config_data[CONF_PORT]),
+            config_data[CONF_API_KEY],
+            config_data[CONF_USE_HTTPS],
+            config_data[CONF_VERIFY_SSL],
+        )
+
+    @staticmethod
+    def _request_timeout(config_data: Dict[str, Any]) -> float:
+        """请求超时短于刷新间隔：不可达的设备不会拖到下一轮"""
+        return min(REQUEST_TIMEOUT, max(config_data[CONF_UPDATE_INTERVAL] / 2, 1))
+
+    @callback
+    def async_acquire_client(
+        self, config_data: Dict[str, Any]
+    ) -> Tuple[Tuple, SurgeAPIClient]:
+        """获取（或创建）设备共享的API客户端，引用计数+1
+
+        返回(客户端键, 客户端)；释放时需传入该键（配置项数据之后可能被修改）。
+        """
+        key = self._client_key(config_data)
+        timeout = self._request_timeout(config_data)
+        client = self._clients.get(key)
+        if client is not None and timeout < client.request_timeout.total:
+            # 共享客户端的配置项刷新间隔不同时，按最短的间隔取超时
+            client.request_timeout = aiohttp.ClientTimeout(total=timeout)
+        if client is None:
+            client = self._clients[key] = SurgeAPIClient(
+                host=config_data[CONF_HOST],
+                port=config_data[CONF_PORT],
+                api_key=config_data[CONF_API_KEY],
+                session=async_get_clientsession(self.hass),
+                use_https=config_data[CONF_USE_HTTPS],
+                verify_ssl=config_data[CONF_VERIFY_SSL],
+                request_semaphore=self.semaphore,
+                max_concurrent_requests=FLEET_MAX_REQUESTS_PER_DEVICE,
+                request_timeout=timeout,
+            )
+        self._client_refs[key] = self._client_refs.get(key, 0) + 1
+        return key, client
+
+    @callback
+    def async_release_client(self, key: Tuple) -> None:
+        """按获取时的客户端键释放引用，无引用时移除"""
+        refs = self._client_refs.get(key, 0) - 1
+        if refs > 0:
+            self._client_refs[key] = refs
+            return
+        self._client_refs.pop(key, None)
+        self._clients.pop(key, None)
+
+    # ---------- 错峰轮询 ----------
+    def _next_phase(self) -> float:
+        """为新配置项分配相位（刷新间隔的比例）"""
+        self._phase = (self._phase + _GOLDEN_RATIO) % 1.0
+        return self._phase
+
+    @callback
+    def async_register(
+        self,
+        entry_id: str,
+        update_interval: float,
+        refresh: Callable[[], Awaitable[None]],
+    ) -> CALLBACK_TYPE:
+        """注册刷新回调（同一配置项的回调在同一时刻一起执行），返回注销函数"""
+        schedule = self._schedules.get(entry_id)
+        if schedule is None:
+            delay = self._next_phase() * update_interval
+            schedule = self._schedules[entry_id] = _EntrySchedule(
+                update_interval, self.hass.loop.time() + delay
+            )
+            self._arm(entry_id, schedule, delay)
+        schedule.refreshers.append(refresh)
+
+        @callback
+        def _unregister() -> None:
+            schedule.refreshers.remove(refresh)
+            if schedule.refreshers or self._schedules.get(entry_id) is not schedule:
+                return
+            if schedule.cancel is not None:
+                schedule.cancel()
+            del self._schedules[entry_id]
+
+        return _unregister
+
+    def _arm(self, entry_id: str, schedule: _EntrySchedule, delay: float) -> None:
+        schedule.cancel = async_call_later(
+            self.hass, delay, partial(self._async_fire, entry_id)
+        )
+
+    @callback
+    def _async_fire(self, entry_id: str, _now: Any) -> None:
+        """定时触发：安排下一轮（带抖动）并在后台执行本轮刷新"""
+        schedule = self._schedules.get(entry_id)
+        if schedule is None:
+            return
+        jitter = random.uniform(-FLEET_JITTER_RATIO, FLEET_JITTER_RATIO)
+        self._arm(entry_id, schedule, schedule.next_delay(self.hass.loop.time(), jitter))
+        if schedule.lock.locked():
+            # 上一轮（或手动刷新）尚未结束（设备响应慢），跳过本轮避免请求堆积
+            _LOGGER.debug(f"Surge配置项{entry_id}上一轮刷新未完成，跳过本轮")
+            return
+        self.hass.async_create_background_task(
+            self.async_refresh_entry(entry_id), name=f"{DOMAIN}_refresh_{entry_id}"
+        )
+
+    async def async_refresh_entry(self, entry_id: str) -> None:
+        """立即执行指定配置项的所有刷新回调（有刷新正在执行时先等其结束）"""
+        async with self.async_hold_entry(entry_id) as refresh:
+            await refresh()
+
+    @asynccontextmanager
+    async def async_hold_entry(
+        self, entry_id: str
+    ) -> AsyncIterator[Callable[[], Awaitable[None]]]:
+        """独占指定配置项的刷新（等待正在执行的一轮结束，期间定时刷新跳过）
+
+        返回执行一轮刷新的函数，供手动连续刷新（如采样分析）使用。
+        """
+        schedule = self._schedules.get(entry_id)
+        if schedule is None:
+            yield _async_noop
+            return
+        async with schedule.lock:
+            yield partial(_async_run_refreshers, schedule)
+
+
+async def _async_run_refreshers(schedule: _EntrySchedule) -> None:
+    await asyncio.gather(*(refresh() for refresh in list(schedule.refreshers)))
+
+
+async def _async_noop() -> None:
+    pass
+
+
+@callback
+def get_fleet_scheduler(hass: HomeAssistant) -> SurgeFleetScheduler:
+    """获取（或创建）DOMAIN级共享调度器"""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if FLEET_SCHEDULER not in domain_data:
+        domain_data[FLEET_SCHEDULER] = SurgeFleetScheduler(hass)
+    return domain_data[FLEET_SCHEDULER]
 
 
 async def async_setup(hass: HomeAssistant, config: Dict[str, Any]) -> bool:
-    """废弃：原yaml配置入口，现在通过Config Flow初始化"""
+    """废弃：原yaml配置入口，现在通过Config Flow初始化（仅注册服务）"""
+    async_setup_services(hass)
     return True
 
 
@@ -41,35 +251,37 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     config_data = entry.data
     host = config_data[CONF_HOST]
     port = config_data[CONF_PORT]
-    api_key = config_data[CONF_API_KEY]
-    use_https = config_data[CONF_USE_HTTPS]
-    verify_ssl = config_data[CONF_VERIFY_SSL]
     update_interval = config_data[CONF_UPDATE_INTERVAL]
 
-    # 2. 初始化API客户端
-    session = async_get_clientsession(hass)
+    # 2. 获取API客户端（同一设备的配置项共享客户端和全局并发上限）
+    scheduler = get_fleet_scheduler(hass)
+    client_key, api_client = scheduler.async_acquire_client(config_data)
+    history = SurgeHistoryLog(hass, hass.config.path(HISTORY_DIR), entry.entry_id)
+    coordinator = SurgeDataCoordinator(hass, entry, api_client, history)
     try:
-        api_client = SurgeAPIClient(
-            host=host,
-            port=port,
-            api_key=api_key,
-            session=session,
-            use_https=use_https,
-            verify_ssl=verify_ssl,
-        )
-        # 测试API连接（确保配置有效）
+        # 测试API连接（确保配置有效），并获取首个设备快照
         await api_client.get_profiles()
+        await history.async_load()
+        await coordinator.async_config_entry_first_refresh()
     except Exception as exc:
         _LOGGER.error(f"初始化Surge API客户端失败: {str(exc)}")
+        scheduler.async_release_client(client_key)
         return False
 
     # 3. 创建全局数据存储（供其他平台使用）
-    if DOMAIN not in hass.data:
-        hass.data[DOMAIN] = {}
     hass.data[DOMAIN][entry.entry_id] = {
         API_CLIENT: api_client,
+        CLIENT_KEY: client_key,
+        UPDATE_COORDINATOR: coordinator,
+        DNS_CACHE: SurgeDNSCache(api_client),
+        HISTORY_LOG: history,
     }
 
+    # 设备快照由共享调度器错峰刷新（所有实体共用一个协调器）
+    entry.async_on_unload(
+        scheduler.async_register(entry.entry_id, update_interval, coordinator.async_refresh)
+    )
+
     # 4. 注册实体平台（select/switch/sensor）
     hass.async_create_task(
         hass.config_entries.async_forward_entry_setups(entry, ["select", "switch", "sensor"])
@@ -86,19 +298,23 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """卸载配置项（清理资源）"""
     # 卸载所有平台实体
     unload_ok = await hass.config_entries.async_unload_platforms(entry, ["select", "switch", "sensor"])
-    # 删除全局存储的API客户端
+    # 若正在录制API流量，先保存录制文件
+    await async_finish_capture(hass, entry.entry_id)
+    # 删除全局存储的API客户端（共享客户端引用计数-1），并等待历史记录落盘
     if DOMAIN in hass.data and entry.entry_id in hass.data[DOMAIN]:
-        del hass.data[DOMAIN][entry.entry_id]
-    # 若没有其他配置项，删除整个DOMAIN存储
-    if not hass.data[DOMAIN]:
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        # 按获取时的键释放：配置修改后重新加载时entry.data已是新配置
+        get_fleet_scheduler(hass).async_release_client(entry_data[CLIENT_KEY])
+        await entry_data[HISTORY_LOG].async_close()
+    # 若没有其他配置项，删除整个DOMAIN存储（含共享调度器）
+    if DOMAIN in hass.data and set(hass.data[DOMAIN]) <= {FLEET_SCHEDULER}:
         del hass.data[DOMAIN]
     return unload_ok
 
 
 async def async_update_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """配置项更新时重新初始化（暂不实现，如需修改配置可扩展）"""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    """配置项更新时重新加载（由HA执行卸载回调，避免调度器重复注册）"""
+    await hass.config_entries.async_reload(entry.entry_id)
 
 
 # ------------------------------ 通用实体工具函数 ------------------------------
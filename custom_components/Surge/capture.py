@@ -0,0 +1,152 @@
+"""Surge API 流量录制（诊断用：记录请求/响应及耗时，脱敏后写入本地文件）"""
+
+import gzip
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+CAPTURE_FORMAT_VERSION = 1
+DEFAULT_MAX_ENTRIES = 20000  # 单次录制的最大条数（防止长时间录制占用过多内存）
+
+# JSON字段名包含以下关键字时脱敏
+_SENSITIVE_KEYS = ("password", "passwd", "secret", "token", "key", "psk", "username")
+
+# 配置全文中的敏感内容：(正则, 需脱敏的分组)
+_SECRET_KEYS = r"[\w-]*(?:password|passwd|passphrase|secret|token)[\w-]*|psk|ca-p12|[\w-]+-key"
+_PROFILE_SECRET_PATTERNS = [
+    # http-api的Key（key@地址:端口）
+    (re.compile(r"(http-api\s*=\s*)([^@\s]+)(@)", re.IGNORECASE), (2,)),
+    # 整行键值：MITM证书（ca-p12）及其口令、WireGuard私钥等，值脱敏到行尾
+    (
+        re.compile(rf"^(\s*(?:{_SECRET_KEYS})\s*=\s*)(.*?)(\s*)$", re.IGNORECASE | re.MULTILINE),
+        (2,),
+    ),
+    # 代理行中的参数：password=、psk=、username=、*-key= 等
+    (
+        re.compile(
+            rf"((?:^|[\s,])(?:{_SECRET_KEYS}|username|obfs-host)\s*=\s*)([^,\s]+)",
+            re.IGNORECASE | re.MULTILINE,
+        ),
+        (2,),
+    ),
+    # http/https/socks5代理的位置参数：名称 = 类型, 服务器, 端口, 用户名, 密码
+    (
+        re.compile(
+            r"^(\s*[^=\n#;\[]+?=\s*(?:https?|socks5(?:-tls)?)\s*,[^,\n]+,\s*\d+\s*,\s*)"
+            r"([^,=\n]+?)(?:(\s*,\s*)([^,=\n]+?))?(\s*(?:,|$))",
+            re.IGNORECASE | re.MULTILINE,
+        ),
+        (2, 4),
+    ),
+]
+
+
+def _mask(value: str) -> str:
+    """等长替换（保持响应体大小不变，回放时负载与真实设备一致）"""
+    return "*" * len(value)
+
+
+def _mask_groups(match: "re.Match[str]", groups: Tuple[int, ...]) -> str:
+    text = match.group(0)
+    for group in sorted(groups, reverse=True):
+        if match.group(group) is None:
+            continue
+        start, end = (pos - match.start() for pos in match.span(group))
+        text = text[:start] + _mask(text[start:end]) + text[end:]
+    return text
+
+
+def redact_text(text: str) -> str:
+    """脱敏配置全文（API Key、证书/私钥及口令、代理用户名密码）"""
+    for pattern, groups in _PROFILE_SECRET_PATTERNS:
+        text = pattern.sub(lambda m: _mask_groups(m, groups), text)
+    return text
+
+
+def redact_payload(payload: Any) -> Any:
+    """递归脱敏JSON数据（敏感字段值与字符串中的密钥均等长替换）"""
+    if isinstance(payload, dict):
+        redacted = {}
+        for key, value in payload.items():
+            if isinstance(value, str) and any(s in key.lower() for s in _SENSITIVE_KEYS):
+                redacted[key] = _mask(value)
+            else:
+                redacted[key] = redact_payload(value)
+        return redacted
+    if isinstance(payload, list):
+        return [redact_payload(item) for item in payload]
+    if isinstance(payload, str):
+        return redact_text(payload)
+    return payload
+
+
+class SurgeTrafficCapture:
+    """内存中累积录制条目，停止后一次性写入gzip压缩的JSON Lines文件
+
+    文件格式：首行为文件头，其后每行一条记录：
+        {"t": 相对开始时间(秒), "m": 方法, "e": 接口, "s": 状态码(连接失败为0),
+         "ms": 耗时(毫秒), "n": 原始响应字节数, "b": 脱敏后的响应体}
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        self._started = time.monotonic()
+        self._started_wall = time.time()
+        self.entries: List[Dict[str, Any]] = []
+        self.dropped = 0  # 超出上限未记录的条数
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        status: int,
+        latency: float,
+        body: Optional[bytes],
+    ) -> None:
+        """记录一次请求（body为原始响应字节，记录前脱敏）"""
+        if len(self.entries) >= self._max_entries:
+            self.dropped += 1
+            return
+        self.entries.append(
+            {
+                "t": round(time.monotonic() - self._started - latency, 4),
+                "m": method,
+                "e": endpoint.lstrip("/"),
+                "s": status,
+                "ms": round(latency * 1000, 2),
+                "n": len(body) if body is not None else 0,
+                "b": self._redact_body(body),
+            }
+        )
+
+    @staticmethod
+    def _redact_body(body: Optional[bytes]) -> Any:
+        if not body:
+            return None
+        try:
+            return redact_payload(json.loads(body))
+        except ValueError:
+            # 非JSON响应：按文本脱敏
+            return redact_text(body.decode("utf-8", errors="replace"))
+
+    def write(self, path: str) -> None:
+        """写入录制文件（阻塞IO，需在执行器中调用）"""
+        header = {
+            "version": CAPTURE_FORMAT_VERSION,
+            "started": self._started_wall,
+            "entries": len(self.entries),
+            "dropped": self.dropped,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            file.write(json.dumps(header, separators=(",", ":")) + "\n")
+            for entry in self.entries:
+                file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_capture(path: str) -> Dict[str, Any]:
+    """读取录制文件，返回{"header": 文件头, "entries": 记录列表}"""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        entries = [json.loads(line) for line in file if line.strip()]
+    return {"header": header, "entries": entries}
@@ -1,13 +1,16 @@
 """Surge Integration 配置流（UI配置）"""
 
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.components.network import async_get_source_ip
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.service_info.zeroconf import ZeroconfServiceInfo
 
 from .const import (
     CONF_API_KEY,
@@ -22,7 +25,7 @@ from .const import (
     DEFAULT_VERIFY_SSL,
     DOMAIN,
 )
-from .surge_api import SurgeAPIClient, SurgeAPIError
+from .discovery import ProbeAuthError, async_probe_connection, async_scan_subnet
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,23 +50,70 @@ class SurgeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1  # 配置版本（用于后续迁移）
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL  # 本地轮询连接
 
+    def __init__(self) -> None:
+        self._prefill: Dict[str, Any] = {}  # 发现的设备信息（预填到手动配置表单）
+        self._discovered_hosts: List[str] = []
+
     async def async_step_user(
         self, user_input: Optional[Dict[str, Any]] = None
     ) -> FlowResult:
-        """处理用户首次配置步骤"""
+        """首次配置：选择扫描局域网或手动填写"""
+        return self.async_show_menu(step_id="user", menu_options=["discover", "manual"])
+
+    async def async_step_discover(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        """扫描本机所在网段中开放Surge API端口的设备"""
+        if user_input is not None:
+            self._prefill = {CONF_HOST: user_input[CONF_HOST], CONF_PORT: DEFAULT_PORT}
+            return await self.async_step_manual()
+
+        if not self._discovered_hosts:
+            configured = {entry.data[CONF_HOST] for entry in self._async_current_entries()}
+            source_ip = await async_get_source_ip(self.hass)
+            hosts = await async_scan_subnet(source_ip, DEFAULT_PORT) if source_ip else []
+            self._discovered_hosts = [host for host in hosts if host not in configured]
+            _LOGGER.info(f"局域网扫描发现{len(self._discovered_hosts)}个未配置的Surge设备")
+
+        if not self._discovered_hosts:
+            return self.async_show_form(
+                step_id="manual",
+                data_schema=STEP_USER_DATA_SCHEMA,
+                errors={"base": "no_devices_found"},
+            )
+        return self.async_show_form(
+            step_id="discover",
+            data_schema=vol.Schema({vol.Required(CONF_HOST): vol.In(self._discovered_hosts)}),
+        )
+
+    async def async_step_zeroconf(self, discovery_info: ZeroconfServiceInfo) -> FlowResult:
+        """通过zeroconf/mDNS发现的设备"""
+        host = discovery_info.host
+        port = discovery_info.port or DEFAULT_PORT
+        await self.async_set_unique_id(f"surge_{host}_{port}")
+        self._abort_if_unique_id_configured()
+
+        self._prefill = {CONF_HOST: host, CONF_PORT: port}
+        self.context["title_placeholders"] = {"host": host}
+        return await self.async_step_manual()
+
+    async def async_step_manual(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        """手动填写/确认配置（发现的设备会预填地址和端口）"""
         errors: Dict[str, str] = {}
 
         # 1. 若用户提交了配置（点击"提交"按钮）
         if user_input is not None:
-            try:
-                # 验证配置：测试与Surge的连接
-                await self._validate_config(user_input)
+            # 检查是否已存在相同配置（避免重复添加，无需探测）
+            await self.async_set_unique_id(
+                f"surge_{user_input[CONF_HOST]}_{user_input[CONF_PORT]}"
+            )
+            self._abort_if_unique_id_configured()
 
-                # 检查是否已存在相同配置（避免重复添加）
-                await self.async_set_unique_id(
-                    f"surge_{user_input[CONF_HOST]}_{user_input[CONF_PORT]}"
-                )
-                self._abort_if_unique_id_configured()
+            try:
+                # 验证配置：并发探测HTTP/HTTPS组合，使用最先成功的组合
+                user_input = {**user_input, **await self._validate_config(user_input)}
 
                 # 配置验证通过，创建配置项
                 return self.async_create_entry(
@@ -82,10 +132,12 @@ class SurgeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 _LOGGER.exception(f"配置验证未知错误: {exc}")
                 errors["base"] = "unknown"  # 未知错误
 
-        # 2. 显示配置表单（首次进入或验证失败时）
+        # 2. 显示配置表单（首次进入、发现设备后或验证失败时）
         return self.async_show_form(
-            step_id="user",  # 步骤ID（固定为user）
-            data_schema=STEP_USER_DATA_SCHEMA,  # 表单字段定义
+            step_id="manual",
+            data_schema=self.add_suggested_values_to_schema(
+                STEP_USER_DATA_SCHEMA, user_input or self._prefill
+            ),
             errors=errors,  # 错误提示（为空则不显示）
             description_placeholders={
                 "host": "Surge设备的局域网IP（如192.168.1.100）",
@@ -100,29 +152,34 @@ class SurgeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """支持后续修改配置（可选，此处暂不实现）"""
         return SurgeOptionsFlow(config_entry)
 
-    async def _validate_config(self, user_input: Dict[str, Any]) -> None:
-        """验证用户配置：测试与Surge的API连接"""
-        # 创建临时API客户端
-        session = self.hass.helpers.aiohttp_client.async_get_clientsession()
-        client = SurgeAPIClient(
-            host=user_input[CONF_HOST],
-            port=user_input[CONF_PORT],
-            api_key=user_input[CONF_API_KEY],
-            session=session,
-            use_https=user_input[CONF_USE_HTTPS],
-            verify_ssl=user_input[CONF_VERIFY_SSL],
-        )
-
+    async def _validate_config(self, user_input: Dict[str, Any]) -> Dict[str, bool]:
+        """验证用户配置：并发探测各协议组合，返回可用的HTTPS/SSL设置"""
+        session = async_get_clientsession(self.hass)
         try:
-            # 测试请求：获取配置列表（验证连接和权限）
-            await client.get_profiles()
+            result = await async_probe_connection(
+                session,
+                user_input[CONF_HOST],
+                user_input[CONF_PORT],
+                user_input[CONF_API_KEY],
+                preferred=(user_input[CONF_USE_HTTPS], user_input[CONF_VERIFY_SSL]),
+            )
         except ConnectionError as exc:
             raise CannotConnect from exc
-        except ValueError as exc:
+        except ProbeAuthError as exc:
             raise InvalidAuth from exc
         except Exception as exc:
             raise SurgeAPIError from exc
 
+        if (result[CONF_USE_HTTPS], result[CONF_VERIFY_SSL]) != (
+            user_input[CONF_USE_HTTPS],
+            user_input[CONF_VERIFY_SSL],
+        ):
+            _LOGGER.info(
+                f"Surge设备{user_input[CONF_HOST]}实际可用的连接方式："
+                f"HTTPS={result[CONF_USE_HTTPS]}，SSL验证={result[CONF_VERIFY_SSL]}"
+            )
+        return result
+
 
 class SurgeOptionsFlow(config_entries.OptionsFlow):
     """配置修改流程（暂不实现，如需支持修改可扩展）"""
@@ -17,7 +17,71 @@ DEFAULT_UPDATE_INTERVAL = 30
 DEFAULT_USE_HTTPS = False
 DEFAULT_VERIFY_SSL = True
 
+# 全局存储键（用于传递API客户端和配置）
+API_CLIENT = "api_client"
+CLIENT_KEY = "client_key"  # 获取共享API客户端时的键（释放时使用）
+UPDATE_COORDINATOR = "update_coordinator"
+FLEET_SCHEDULER = "fleet_scheduler"  # 多设备共享调度器（DOMAIN级别，非配置项）
+CAPTURE_CANCEL = "capture_cancel"  # 流量录制的自动停止定时器
+DNS_CACHE = "dns_cache"  # DNS缓存快照
+HISTORY_LOG = "history_log"  # 状态变化历史日志
+
+# 多设备（Fleet）调度参数
+FLEET_MAX_CONCURRENT_REQUESTS = 8  # 所有配置项共享的并发请求上限
+FLEET_JITTER_RATIO = 0.1  # 每轮刷新的随机抖动（相对刷新间隔的比例）
+FLEET_MAX_REQUESTS_PER_DEVICE = 4  # 单台设备的并发请求上限（不可达的设备最多占用这么多全局名额）
+REQUEST_TIMEOUT = 10  # 单个请求的超时（秒）；刷新间隔较短时取间隔的一半
+
+# 功能开关（通用+Mac专属）
+SUPPORTED_FEATURES = ["mitm", "capture", "rewrite", "scripting"]
+MAC_ONLY_FEATURES = ["system_proxy", "enhanced_mode"]
+
+# 模块开关：短时间内的多次修改合并为一次请求
+MODULE_BATCH_DELAY = 0.2  # 合并窗口（秒）
+
+# DNS缓存快照有效期（秒）：传感器/服务在有效期内复用快照，不重复拉取完整缓存
+DNS_CACHE_MAX_AGE = 300
+
+# 状态变化事件（每轮刷新与上一次快照对比，区分由HA发起还是外部修改）
+EVENT_PROFILE_CHANGED = "surge_profile_changed"
+EVENT_POLICY_CHANGED = "surge_policy_changed"
+EVENT_FEATURE_CHANGED = "surge_feature_changed"
+EVENT_OUTBOUND_CHANGED = "surge_outbound_changed"
+SOURCE_HOMEASSISTANT = "homeassistant"  # 由HA实体发起的修改
+SOURCE_EXTERNAL = "external"  # 在设备上或其他客户端修改
+EXPECTED_CHANGE_TIMEOUT = 60  # HA发起的修改在此时间内出现在快照中才记为homeassistant（秒）
+
+# 状态变化历史日志（按大小轮转：每个配置项最多HISTORY_MAX_FILES个文件）
+HISTORY_MAX_BYTES = 1024 * 1024  # 单个文件上限（约1.5万条）
+HISTORY_MAX_FILES = 10
+HISTORY_DIR = "surge_history"  # 历史日志目录（位于HA配置目录下）
+DEFAULT_HISTORY_LIMIT = 1000  # 查询默认最多返回条数
+
 # 实体相关常量
 DEVICE_MANUFACTURER = "Surge"
 DEVICE_MODEL = "Surge Mac/iOS"
 DEVICE_NAME = "Surge Controller"
+
+# 服务
+SERVICE_START_CAPTURE = "start_capture"  # 开始录制API流量
+SERVICE_STOP_CAPTURE = "stop_capture"  # 停止录制并写入文件
+SERVICE_PROFILE_REFRESH = "profile_refresh"  # 采样分析N轮刷新
+SERVICE_DNS_LOOKUP = "dns_lookup"  # 查询DNS缓存中的域名
+SERVICE_FLUSH_DNS = "flush_dns"  # 清空DNS缓存
+SERVICE_QUERY_HISTORY = "query_history"  # 查询状态变化历史
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_DURATION = "duration"
+ATTR_MAX_ENTRIES = "max_entries"
+ATTR_CYCLES = "cycles"
+ATTR_SAMPLE_INTERVAL = "sample_interval"
+ATTR_DOMAIN = "domain"
+ATTR_REFRESH = "refresh"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_KIND = "kind"
+ATTR_GROUP = "group"
+ATTR_LIMIT = "limit"
+DEFAULT_CAPTURE_DURATION = 300  # 录制时长默认5分钟
+CAPTURE_DIR = "surge_captures"  # 录制文件目录（位于HA配置目录下）
+DEFAULT_PROFILE_CYCLES = 5  # 采样分析默认刷新轮数
+PROFILE_DIR = "surge_profiles"  # 采样分析报告目录（位于HA配置目录下）
@@ -0,0 +1,426 @@
+"""Surge 设备数据协调器（每个配置项一个：不可变快照 + 按键订阅）"""
+
+import asyncio
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, Context, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import (
+    CONF_HOST,
+    CONF_PORT,
+    EVENT_FEATURE_CHANGED,
+    EVENT_OUTBOUND_CHANGED,
+    EVENT_POLICY_CHANGED,
+    EVENT_PROFILE_CHANGED,
+    EXPECTED_CHANGE_TIMEOUT,
+    MAC_ONLY_FEATURES,
+    MODULE_BATCH_DELAY,
+    SOURCE_EXTERNAL,
+    SOURCE_HOMEASSISTANT,
+    SUPPORTED_FEATURES,
+)
+from .surge_api import SurgeAPIClient
+
+if TYPE_CHECKING:
+    from .history import SurgeHistoryLog
+
+_LOGGER = logging.getLogger(__name__)
+
+# 快照键（实体按键订阅，只有自己渲染的键变化时才被唤醒）
+KEY_PROFILES = "profiles"
+KEY_CURRENT_PROFILE = "current_profile"
+KEY_OUTBOUND = "outbound"
+KEY_TRAFFIC = "traffic"
+FEATURE_KEY_PREFIX = "feature:"
+GROUP_KEY_PREFIX = "group:"
+MODULE_KEY_PREFIX = "module:"
+
+ALL_FEATURES = SUPPORTED_FEATURES + MAC_ONLY_FEATURES
+
+# 状态变化类型 → (事件类型, 事件数据中名称字段)
+TRANSITION_PROFILE = "profile"
+TRANSITION_POLICY = "policy"
+TRANSITION_FEATURE = "feature"
+TRANSITION_OUTBOUND = "outbound"
+TRANSITION_EVENTS: Dict[str, Tuple[str, Optional[str]]] = {
+    TRANSITION_PROFILE: (EVENT_PROFILE_CHANGED, None),
+    TRANSITION_POLICY: (EVENT_POLICY_CHANGED, "group"),
+    TRANSITION_FEATURE: (EVENT_FEATURE_CHANGED, "feature"),
+    TRANSITION_OUTBOUND: (EVENT_OUTBOUND_CHANGED, None),
+}
+
+
+def feature_key(feature: str) -> str:
+    return f"{FEATURE_KEY_PREFIX}{feature}"
+
+
+def group_key(group_name: str) -> str:
+    return f"{GROUP_KEY_PREFIX}{group_name}"
+
+
+def module_key(module: str) -> str:
+    return f"{MODULE_KEY_PREFIX}{module}"
+
+
+# ------------------------------ 不可变快照 ------------------------------
+@dataclass(frozen=True, slots=True)
+class SurgePolicyGroupState:
+    """单个策略组状态（policies为驻留元组，未变化时跨刷新共享同一对象）"""
+
+    current: Optional[str]
+    policies: Tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class SurgeTraffic:
+    """流量（单位：MB）"""
+
+    upload: float
+    download: float
+    total: float
+
+
+@dataclass(frozen=True, slots=True)
+class SurgeSnapshot:
+    """单台设备在一次刷新中的完整状态（值为None表示该部分获取失败/不支持）"""
+
+    profiles: Tuple[str, ...]
+    current_profile: Optional[str]
+    outbound_mode: Optional[str]
+    traffic: Optional[SurgeTraffic]
+    features: Mapping[str, Optional[bool]]
+    policy_groups: Mapping[str, Optional[SurgePolicyGroupState]]
+    modules: Optional[Mapping[str, bool]]  # 模块列表获取失败时为None
+
+    def keys(self) -> FrozenSet[str]:
+        """快照包含的全部键"""
+        return frozenset(
+            [KEY_PROFILES, KEY_CURRENT_PROFILE, KEY_OUTBOUND, KEY_TRAFFIC]
+            + [feature_key(feature) for feature in self.features]
+            + [group_key(name) for name in self.policy_groups]
+            + [module_key(name) for name in self.modules or ()]
+        )
+
+    def changed_keys(self, previous: Optional["SurgeSnapshot"]) -> FrozenSet[str]:
+        """与上一次快照对比，返回发生变化的键（驻留对象先比较身份，开销很小）"""
+        if previous is None:
+            return self.keys()
+        changed: Set[str] = set()
+        if self.profiles is not previous.profiles and self.profiles != previous.profiles:
+            changed.add(KEY_PROFILES)
+        if self.current_profile != previous.current_profile:
+            changed.add(KEY_CURRENT_PROFILE)
+        if self.outbound_mode != previous.outbound_mode:
+            changed.add(KEY_OUTBOUND)
+        if self.traffic != previous.traffic:
+            changed.add(KEY_TRAFFIC)
+        for feature in self.features.keys() | previous.features.keys():
+            if self.features.get(feature) != previous.features.get(feature):
+                changed.add(feature_key(feature))
+        for name in self.policy_groups.keys() | previous.policy_groups.keys():
+            state = self.policy_groups.get(name)
+            old_state = previous.policy_groups.get(name)
+            if state is not old_state and state != old_state:
+                changed.add(group_key(name))
+        if self.modules != previous.modules:
+            # 获取失败时整体为None，各模块的值也视为None（与True/False不同）
+            modules = self.modules or {}
+            old_modules = previous.modules or {}
+            for name in modules.keys() | old_modules.keys():
+                if modules.get(name) != old_modules.get(name):
+                    changed.add(module_key(name))
+        return frozenset(changed)
+
+
+@dataclass(frozen=True, slots=True)
+class SurgeTransition:
+    """一次状态变化（配置/策略/功能/出站模式）"""
+
+    kind: str  # TRANSITION_*
+    name: Optional[str]  # 策略组名或功能名（配置/出站模式为None）
+    old: Any
+    new: Any
+    source: str  # SOURCE_HOMEASSISTANT / SOURCE_EXTERNAL
+
+
+def iter_transitions(
+    previous: SurgeSnapshot, current: SurgeSnapshot, changed: Iterable[str]
+) -> Iterator[Tuple[str, str, Optional[str], Any, Any]]:
+    """按变化键生成 (键, 类型, 名称, 旧值, 新值)
+
+    某部分在任一快照中为None（获取失败）时不算状态变化，避免临时失败产生成对的假事件。
+    """
+    for key in changed:
+        if key == KEY_CURRENT_PROFILE:
+            kind, name = TRANSITION_PROFILE, None
+            old, new = previous.current_profile, current.current_profile
+        elif key == KEY_OUTBOUND:
+            kind, name = TRANSITION_OUTBOUND, None
+            old, new = previous.outbound_mode, current.outbound_mode
+        elif key.startswith(FEATURE_KEY_PREFIX):
+            kind, name = TRANSITION_FEATURE, key[len(FEATURE_KEY_PREFIX) :]
+            old, new = previous.features.get(name), current.features.get(name)
+        elif key.startswith(GROUP_KEY_PREFIX):
+            kind, name = TRANSITION_POLICY, key[len(GROUP_KEY_PREFIX) :]
+            old_state = previous.policy_groups.get(name)
+            state = current.policy_groups.get(name)
+            old = old_state.current if old_state else None
+            new = state.current if state else None
+        else:
+            continue
+        if old is not None and new is not None and old != new:
+            yield key, kind, name, old, new
+
+
+class _InternPool:
+    """字符串/元组驻留池：相同的策略列表在各策略组、各次刷新间共享同一对象"""
+
+    def __init__(self) -> None:
+        self._tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def intern_tuple(self, values: Iterable[str]) -> Tuple[str, ...]:
+        items = tuple(sys.intern(str(value)) for value in values)
+        return self._tuples.setdefault(items, items)
+
+    def prune(self, snapshot: SurgeSnapshot) -> None:
+        """只保留最新快照仍在使用的元组（内存不随刷新次数增长）"""
+        live: Dict[Tuple[str, ...], Tuple[str, ...]] = {snapshot.profiles: snapshot.profiles}
+        for state in snapshot.policy_groups.values():
+            if state is not None:
+                live[state.policies] = state.policies
+        self._tuples = live
+
+
+# ------------------------------ 数据获取 ------------------------------
+async def async_fetch_snapshot(
+    client: SurgeAPIClient,
+    previous: Optional[SurgeSnapshot] = None,
+    pool: Optional[_InternPool] = None,
+) -> SurgeSnapshot:
+    """并发获取一次完整快照（每个策略组只请求一次）
+
+    单个部分失败时该部分为None（对应实体不可用）；全部失败时抛出首个异常。
+    """
+    pool = pool or _InternPool()
+    group_names = await client.get_policy_groups()
+
+    results = await asyncio.gather(
+        client.get_profiles(),
+        client.get_current_profile(),
+        client.get_outbound_mode(),
+        client.get_traffic(),
+        client.get_modules(),
+        *(client.get_feature_status(feature) for feature in ALL_FEATURES),
+        *(client.get_policy_group(name) for name in group_names),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors and len(errors) == len(results):
+        raise errors[0]
+
+    def value(result):
+        return None if isinstance(result, Exception) else result
+
+    profiles, current_profile, outbound_mode, traffic, modules = map(value, results[:5])
+    feature_results = results[5 : 5 + len(ALL_FEATURES)]
+    group_results = results[5 + len(ALL_FEATURES) :]
+
+    for feature, result in zip(ALL_FEATURES, feature_results):
+        if isinstance(result, Exception) and feature not in MAC_ONLY_FEATURES:
+            _LOGGER.debug(f"更新{feature}状态失败: {str(result)}")
+
+    old_groups = previous.policy_groups if previous else {}
+    groups: Dict[str, Optional[SurgePolicyGroupState]] = {}
+    for name, result in zip(group_names, group_results):
+        if isinstance(result, Exception):
+            _LOGGER.debug(f"更新策略组{name}失败: {str(result)}")
+            groups[sys.intern(name)] = None
+            continue
+        state = SurgePolicyGroupState(
+            current=result["current"], policies=pool.intern_tuple(result["policies"])
+        )
+        old_state = old_groups.get(name)
+        # 未变化时沿用上一次的对象（实体比较时只需比较身份）
+        groups[sys.intern(name)] = old_state if old_state == state else state
+
+    snapshot = SurgeSnapshot(
+        profiles=pool.intern_tuple(profiles or ()),
+        current_profile=current_profile,
+        outbound_mode=outbound_mode,
+        traffic=SurgeTraffic(**traffic) if traffic else None,
+        features=MappingProxyType(
+            {feature: value(result) for feature, result in zip(ALL_FEATURES, feature_results)}
+        ),
+        policy_groups=MappingProxyType(groups),
+        modules=MappingProxyType(
+            {sys.intern(name): enabled for name, enabled in modules.items()}
+        )
+        if modules is not None
+        else None,
+    )
+    pool.prune(snapshot)
+    return snapshot
+
+
+# ------------------------------ 协调器 ------------------------------
+class SurgeDataCoordinator(DataUpdateCoordinator[SurgeSnapshot]):
+    """每个配置项一个协调器：由共享调度器触发刷新，只唤醒订阅了变化键的实体"""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        api_client: SurgeAPIClient,
+        history: Optional["SurgeHistoryLog"] = None,
+    ) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name=f"Surge {entry.data[CONF_HOST]}:{entry.data[CONF_PORT]}",
+            update_interval=None,  # 定时刷新由共享调度器错峰触发
+            always_update=False,  # 快照未变化时不通知
+        )
+        self.api_client = api_client
+        self.history = history  # 状态变化历史日志（每条变化都追加一行）
+        self._pool = _InternPool()
+        self._key_listeners: Dict[str, List[CALLBACK_TYPE]] = {}
+        self._notified: Optional[SurgeSnapshot] = None  # 上次通知时的快照
+        self._notified_success = True
+        self.changed_keys: FrozenSet[str] = frozenset()  # 最近一次刷新变化的键
+        self._pending_modules: Dict[str, bool] = {}  # 待合并提交的模块修改
+        self._modules_flushed: Optional[asyncio.Future] = None
+        # HA发起的修改：键 → (期望值, 截止时间, 服务调用上下文)
+        self._expected: Dict[str, Tuple[Any, float, Optional[Context]]] = {}
+
+    async def _async_update_data(self) -> SurgeSnapshot:
+        try:
+            return await async_fetch_snapshot(self.api_client, self.data, self._pool)
+        except Exception as exc:
+            raise UpdateFailed(f"更新Surge设备数据失败: {str(exc)}") from exc
+
+    async def async_set_module(self, module: str, enabled: bool) -> None:
+        """修改模块开关：合并窗口内的多次修改（如自动化一次切换多个模块）只发一次请求"""
+        self._pending_modules[module] = enabled
+        if self._modules_flushed is None:
+            self._modules_flushed = self.hass.loop.create_future()
+            async_call_later(self.hass, MODULE_BATCH_DELAY, self._async_flush_modules)
+        await self._modules_flushed
+
+    async def _async_flush_modules(self, _now: Any) -> None:
+        changes, self._pending_modules = self._pending_modules, {}
+        flushed, self._modules_flushed = self._modules_flushed, None
+        try:
+            await self.api_client.set_modules(changes)
+        except Exception as exc:
+            flushed.set_exception(exc)
+            return
+        # 直接刷新而不用async_request_refresh：后者有防抖，可能在拉取新状态前就返回
+        await self.async_refresh()
+        flushed.set_result(None)
+
+    @callback
+    def async_expect_change(
+        self, key: str, value: Any, context: Optional[Context] = None
+    ) -> None:
+        """登记HA发起的修改：之后的刷新中该键变为value时，事件来源记为homeassistant"""
+        self._expected[key] = (value, time.monotonic() + EXPECTED_CHANGE_TIMEOUT, context)
+
+    @callback
+    def async_subscribe(
+        self, keys: Iterable[str], update_callback: CALLBACK_TYPE
+    ) -> Callable[[], None]:
+        """订阅快照键，返回取消订阅函数"""
+        keys = list(keys)
+        for key in keys:
+            self._key_listeners.setdefault(key, []).append(update_callback)
+
+        @callback
+        def _unsubscribe() -> None:
+            for key in keys:
+                listeners = self._key_listeners.get(key, [])
+                if update_callback in listeners:
+                    listeners.remove(update_callback)
+                if not listeners:
+                    self._key_listeners.pop(key, None)
+
+        return _unsubscribe
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """按变化键通知订阅者（可用性变化或首次通知时通知全部订阅者）"""
+        previous, self._notified = self._notified, self.data
+        success = self.last_update_success
+        notify_all = previous is None or success != self._notified_success
+        self._notified_success = success
+
+        if notify_all:
+            self.changed_keys = self.data.keys() if self.data else frozenset()
+            callbacks = {cb for listeners in self._key_listeners.values() for cb in listeners}
+        else:
+            self.changed_keys = self.data.changed_keys(previous) if success else frozenset()
+            callbacks = {
+                cb for key in self.changed_keys for cb in self._key_listeners.get(key, ())
+            }
+        for update_callback in callbacks:
+            update_callback()
+        super().async_update_listeners()
+
+        # 恢复可用时与失败前的最后一次快照对比
+        if success and previous is not None:
+            changed = self.data.changed_keys(previous) if notify_all else self.changed_keys
+            self._async_fire_transitions(previous, changed)
+
+    @callback
+    def _async_fire_transitions(self, previous: SurgeSnapshot, changed: Iterable[str]) -> None:
+        """对比快照，为每个状态变化触发surge_*_changed事件"""
+        now = time.monotonic()
+        for key, kind, name, old, new in iter_transitions(previous, self.data, changed):
+            source, context = SOURCE_EXTERNAL, None
+            expected = self._expected.get(key)
+            if expected is not None and expected[0] == new and expected[1] >= now:
+                del self._expected[key]
+                source, context = SOURCE_HOMEASSISTANT, expected[2]
+            transition = SurgeTransition(kind, name, old, new, source)
+            self._async_fire_transition(transition, context)
+            if self.history is not None:
+                self.history.async_append(transition)
+
+        # 清理超时未出现的登记（如修改失败）
+        for key in [key for key, expected in self._expected.items() if expected[1] < now]:
+            del self._expected[key]
+
+    @callback
+    def _async_fire_transition(
+        self, transition: SurgeTransition, context: Optional[Context]
+    ) -> None:
+        event_type, name_field = TRANSITION_EVENTS[transition.kind]
+        event_data: Dict[str, Any] = {
+            "config_entry_id": self.config_entry.entry_id,
+            "host": self.config_entry.data[CONF_HOST],
+        }
+        if name_field is not None:
+            event_data[name_field] = transition.name
+        event_data.update(old=transition.old, new=transition.new, source=transition.source)
+        self.hass.bus.async_fire(event_type, event_data, context=context)
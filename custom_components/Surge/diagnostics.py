@@ -0,0 +1,23 @@
+"""Surge Integration 诊断信息下载"""
+
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import API_CLIENT, CONF_API_KEY, DOMAIN
+
+TO_REDACT = {CONF_API_KEY}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """配置项诊断：配置（已脱敏）+ API请求统计"""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    api_client = entry_data.get(API_CLIENT)
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "api_metrics": api_client.metrics.as_dict() if api_client else None,
+    }
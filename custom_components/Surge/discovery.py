@@ -0,0 +1,123 @@
+"""Surge HTTP API 连接探测与局域网发现（供Config Flow使用）"""
+
+import asyncio
+import ipaddress
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .const import CONF_USE_HTTPS, CONF_VERIFY_SSL, DEFAULT_PORT
+from .surge_api import SurgeAPIClient
+
+_LOGGER = logging.getLogger(__name__)
+
+PROBE_TIMEOUT = 3.0  # 单个协议组合的探测时限（秒）
+SCAN_CONNECT_TIMEOUT = 0.5  # 子网扫描时单个地址的TCP连接时限（秒）
+SCAN_CONCURRENCY = 64  # 子网扫描的最大并发连接数
+SCAN_MAX_HOSTS = 1024  # 最多扫描的地址数（超过/22的网段只扫描前1024个地址）
+
+# 探测的协议组合：(use_https, verify_ssl)
+PROBE_COMBINATIONS: List[Tuple[bool, bool]] = [(False, True), (True, True), (True, False)]
+
+
+class ProbeAuthError(Exception):
+    """设备可达但API Key无效"""
+
+
+def _security_rank(combination: Tuple[bool, bool]) -> int:
+    """0=验证证书的HTTPS，1=不验证证书的HTTPS，2=明文HTTP"""
+    use_https, verify_ssl = combination
+    if not use_https:
+        return 2
+    return 0 if verify_ssl else 1
+
+
+async def async_probe_connection(
+    session: aiohttp.ClientSession,
+    host: str,
+    port: int,
+    api_key: str,
+    preferred: Optional[Tuple[bool, bool]] = None,
+) -> Dict[str, bool]:
+    """并发探测HTTP/HTTPS（含/不含SSL验证），返回成功组合中最安全的一个
+
+    安全性排序：验证证书的HTTPS > 不验证证书的HTTPS > 明文HTTP（同级优先preferred）。
+    证书有效时两种HTTPS都会成功、设备同时开放HTTP时明文也会成功，
+    不能因为较弱的组合先返回就关闭证书校验或明文发送X-Key。
+    返回 {CONF_USE_HTTPS: ..., CONF_VERIFY_SSL: ...}；
+    有组合返回认证失败时抛出ProbeAuthError，全部不可达时抛出ConnectionError。
+    """
+    combinations = list(PROBE_COMBINATIONS)
+    if preferred in combinations:
+        combinations.remove(preferred)
+        combinations.insert(0, preferred)
+    combinations.sort(key=_security_rank)  # 稳定排序：同级时preferred在前
+
+    async def _probe(use_https: bool, verify_ssl: bool) -> Tuple[bool, bool]:
+        client = SurgeAPIClient(
+            host=host,
+            port=port,
+            api_key=api_key,
+            session=session,
+            use_https=use_https,
+            verify_ssl=verify_ssl,
+            quiet=True,
+        )
+        async with asyncio.timeout(PROBE_TIMEOUT):
+            await client.get_profiles()
+        return use_https, verify_ssl
+
+    # 全部组合同时探测，按优先级依次取结果：更优的组合都失败后才采用次优的组合
+    tasks = [asyncio.create_task(_probe(*combination)) for combination in combinations]
+    auth_failed = False
+    try:
+        for task in tasks:
+            try:
+                use_https, verify_ssl = await task
+            except ValueError:
+                auth_failed = True  # 401：协议正确但Key无效
+            except Exception as exc:
+                _LOGGER.debug(f"探测{host}:{port}失败: {exc!r}")
+            else:
+                return {CONF_USE_HTTPS: use_https, CONF_VERIFY_SSL: verify_ssl}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if auth_failed:
+        raise ProbeAuthError
+    raise ConnectionError(f"无法连接Surge设备（{host}:{port}）")
+
+
+async def _async_port_open(host: str, port: int) -> bool:
+    try:
+        async with asyncio.timeout(SCAN_CONNECT_TIMEOUT):
+            _, writer = await asyncio.open_connection(host, port)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+async def async_scan_subnet(
+    source_ip: str, port: int = DEFAULT_PORT, prefix: int = 24
+) -> List[str]:
+    """扫描本机所在网段中开放指定端口的地址（并发数受限）"""
+    network = ipaddress.ip_network(f"{source_ip}/{prefix}", strict=False)
+    semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+
+    async def _check(host: str) -> Optional[str]:
+        async with semaphore:
+            return host if await _async_port_open(host, port) else None
+
+    hosts = []
+    for address in network.hosts():
+        if str(address) == source_ip:
+            continue
+        hosts.append(str(address))
+        if len(hosts) >= SCAN_MAX_HOSTS:
+            break
+
+    results = await asyncio.gather(*(_check(host) for host in hosts))
+    return [host for host in results if host is not None]
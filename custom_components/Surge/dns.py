@@ -0,0 +1,139 @@
+"""Surge DNS缓存快照（按需获取并缓存，避免每次查看都拉取完整DNS缓存）"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .const import DNS_CACHE_MAX_AGE
+from .surge_api import SurgeAPIClient
+
+
+@dataclass(frozen=True, slots=True)
+class SurgeDNSRecord:
+    """单条DNS缓存记录"""
+
+    domain: str
+    addresses: Tuple[str, ...]
+    server: Optional[str]
+    time_cost_ms: Optional[float]  # 解析耗时（毫秒）
+    expires: Optional[float]  # 过期时间（Unix时间戳）
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "domain": self.domain,
+            "addresses": list(self.addresses),
+            "server": self.server,
+            "time_cost_ms": self.time_cost_ms,
+            "expires": self.expires,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class SurgeDNSSnapshot:
+    """一次获取的DNS缓存（含汇总统计和按域名索引）"""
+
+    fetched_at: float  # 获取时间（monotonic）
+    records: Mapping[str, SurgeDNSRecord]  # 小写域名 → 记录
+    local_count: int  # 本地DNS映射条数
+    avg_time_cost_ms: Optional[float]
+    max_time_cost_ms: Optional[float]
+    servers: Mapping[str, int]  # 上游DNS服务器 → 缓存条数
+
+    @property
+    def size(self) -> int:
+        return len(self.records)
+
+    def lookup(self, domain: str) -> List[SurgeDNSRecord]:
+        """查找域名及其子域名的缓存记录"""
+        domain = domain.strip().lower().rstrip(".")
+        suffix = f".{domain}"
+        return [
+            record
+            for name, record in self.records.items()
+            if name == domain or name.endswith(suffix)
+        ]
+
+
+def _parse_snapshot(data: Dict[str, Any]) -> SurgeDNSSnapshot:
+    records: Dict[str, SurgeDNSRecord] = {}
+    servers: Dict[str, int] = {}
+    time_costs: List[float] = []
+    for item in data.get("dnsCache", []):
+        domain = str(item.get("domain", "")).lower().rstrip(".")
+        if not domain:
+            continue
+        time_cost = item.get("timeCost")
+        time_cost_ms = round(time_cost * 1000, 1) if isinstance(time_cost, (int, float)) else None
+        server = item.get("server")
+        records[domain] = SurgeDNSRecord(
+            domain=domain,
+            addresses=tuple(item.get("data") or ()),
+            server=server,
+            time_cost_ms=time_cost_ms,
+            expires=item.get("expiresTime"),
+        )
+        if server:
+            servers[server] = servers.get(server, 0) + 1
+        if time_cost_ms is not None:
+            time_costs.append(time_cost_ms)
+    return SurgeDNSSnapshot(
+        fetched_at=time.monotonic(),
+        records=MappingProxyType(records),
+        local_count=len(data.get("local", [])),
+        avg_time_cost_ms=round(sum(time_costs) / len(time_costs), 1) if time_costs else None,
+        max_time_cost_ms=max(time_costs) if time_costs else None,
+        servers=MappingProxyType(servers),
+    )
+
+
+class SurgeDNSCache:
+    """DNS缓存快照：超过有效期才重新获取，并发调用共享同一次请求"""
+
+    def __init__(self, api_client: SurgeAPIClient, max_age: float = DNS_CACHE_MAX_AGE) -> None:
+        self._api_client = api_client
+        self._max_age = max_age
+        self._lock = asyncio.Lock()
+        self.snapshot: Optional[SurgeDNSSnapshot] = None
+        self._failure: Optional[Tuple[float, Exception]] = None  # (失败时间, 异常)
+
+    @property
+    def stale(self) -> bool:
+        return (
+            self.snapshot is None
+            or time.monotonic() - self.snapshot.fetched_at > self._max_age
+        )
+
+    def _cached_failure(self) -> Optional[Exception]:
+        """有效期内的上次获取失败（设备不支持/暂时不可达时不重复拉取）"""
+        if self._failure is not None and time.monotonic() - self._failure[0] <= self._max_age:
+            return self._failure[1]
+        return None
+
+    async def async_get(self, force: bool = False) -> SurgeDNSSnapshot:
+        """返回DNS缓存快照（过期或force时重新获取；获取失败在有效期内直接抛出同一异常）"""
+        if not force:
+            if not self.stale:
+                return self.snapshot
+            if (failure := self._cached_failure()) is not None:
+                raise failure
+        async with self._lock:
+            # 等锁期间其他调用可能已完成获取（或已失败）
+            if not force and not self.stale:
+                return self.snapshot
+            if not force and (failure := self._cached_failure()) is not None:
+                raise failure
+            try:
+                self.snapshot = _parse_snapshot(await self._api_client.get_dns_cache())
+            except Exception as exc:
+                self._failure = (time.monotonic(), exc)
+                raise
+            self._failure = None
+        return self.snapshot
+
+    async def async_flush(self) -> None:
+        """清空Surge的DNS缓存，并使本地快照失效"""
+        await self._api_client.flush_dns()
+        self.snapshot = None
+        self._failure = None
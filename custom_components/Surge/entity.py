@@ -0,0 +1,59 @@
+"""Surge 实体基类（共享设备协调器，按快照键订阅更新）"""
+
+from typing import Any, Iterable
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+
+from . import get_common_device_info
+from .coordinator import SurgeDataCoordinator, SurgeSnapshot
+
+
+class SurgeEntity(Entity):
+    """所有数据来自设备快照的实体基类
+
+    实体只订阅自己渲染的快照键，其他键变化时不会被唤醒；
+    快照对应部分为None（获取失败/设备不支持）时实体不可用。
+    """
+
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        coordinator: SurgeDataCoordinator,
+        entry: ConfigEntry,
+        keys: Iterable[str],
+    ):
+        self.coordinator = coordinator
+        self.entry = entry
+        self._snapshot_keys = tuple(keys)
+        self._attr_device_info = get_common_device_info(entry)  # 统一设备信息
+
+    async def async_added_to_hass(self) -> None:
+        """实体添加到HA时订阅快照键"""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_subscribe(self._snapshot_keys, self.async_write_ha_state)
+        )
+
+    @callback
+    def _expect_change(self, key: str, value: Any) -> None:
+        """修改设备状态前调用：刷新后该变化的事件来源记为homeassistant（沿用服务调用上下文）"""
+        self.coordinator.async_expect_change(key, value, self._context)
+
+    @property
+    def snapshot(self) -> SurgeSnapshot:
+        return self.coordinator.data
+
+    @property
+    def available(self) -> bool:
+        return (
+            self.coordinator.last_update_success
+            and self.coordinator.data is not None
+            and self._snapshot_available()
+        )
+
+    def _snapshot_available(self) -> bool:
+        """子类覆盖：快照中本实体的数据是否有效"""
+        return True
@@ -0,0 +1,277 @@
+"""Surge 状态变化历史（按配置项追加写入的紧凑日志 + 内存索引）
+
+日志为JSON Lines，每行一条变化：
+    [时间戳(秒), 类型, 名称, 旧值, 新值, 来源]
+文件按大小轮转：<目录>/<配置项ID>.<序号>.log，写满后序号+1开新文件，
+只保留最近HISTORY_MAX_FILES个文件。文件从不重命名，索引中的(序号, 偏移)始终有效。
+查询时先在内存索引中按时间/策略组定位，再只读取命中行，不加载整个文件。
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import re
+import sys
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import HISTORY_MAX_BYTES, HISTORY_MAX_FILES
+from .coordinator import TRANSITION_POLICY, SurgeTransition
+
+_LOGGER = logging.getLogger(__name__)
+
+# 行在文件中的位置：(文件序号, 偏移, 长度)
+_Location = Tuple[int, int, int]
+
+
+def _encode(ts: float, transition: SurgeTransition) -> bytes:
+    return (
+        json.dumps(
+            [
+                round(ts, 3),
+                transition.kind,
+                transition.name,
+                transition.old,
+                transition.new,
+                transition.source,
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        + "\n"
+    ).encode()
+
+
+def _decode(line: bytes) -> Dict[str, Any]:
+    ts, kind, name, old, new, source = json.loads(line)
+    return {"ts": ts, "kind": kind, "name": name, "old": old, "new": new, "source": source}
+
+
+class SurgeHistoryLog:
+    """单个配置项的状态变化日志
+
+    索引只在事件循环中修改；文件读写在执行器中进行，写入按批串行执行。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        directory: str,
+        entry_id: str,
+        max_bytes: int = HISTORY_MAX_BYTES,
+        max_files: int = HISTORY_MAX_FILES,
+    ) -> None:
+        self.hass = hass
+        self._directory = directory
+        self._entry_id = entry_id
+        self._max_bytes = max_bytes
+        self._max_files = max_files
+        self._file_pattern = re.compile(rf"^{re.escape(entry_id)}\.(\d+)\.log$")
+
+        # 内存索引（按时间递增）：第i条的绝对编号为 self._dropped + i
+        self._ts = array("d")
+        self._locations: List[_Location] = []
+        self._kinds: List[str] = []
+        self._by_group: Dict[str, List[int]] = {}  # 策略组 → 绝对编号列表
+        self._dropped = 0  # 已随旧文件删除的条数
+
+        self._seq = 0  # 当前写入的文件序号
+        self._size = 0  # 当前文件大小
+        self._pending: List[Tuple[float, SurgeTransition]] = []
+        self._writer: Optional[asyncio.Task] = None
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self._directory, f"{self._entry_id}.{seq}.log")
+
+    @property
+    def size(self) -> int:
+        """索引中的条数"""
+        return len(self._ts)
+
+    # ------------------------------ 加载 ------------------------------
+    async def async_load(self) -> None:
+        """扫描已有日志文件，重建内存索引（启动时执行一次）"""
+        try:
+            rows, self._seq, self._size = await self.hass.async_add_executor_job(self._scan)
+        except OSError as exc:
+            _LOGGER.error(f"读取Surge状态变化历史失败: {str(exc)}")
+            return
+        for ts, kind, name, location in rows:
+            self._index(ts, kind, name, location)
+
+    def _scan(self) -> Tuple[List[Tuple[float, str, Optional[str], _Location]], int, int]:
+        os.makedirs(self._directory, exist_ok=True)
+        seqs = sorted(
+            int(match.group(1))
+            for match in map(self._file_pattern.match, os.listdir(self._directory))
+            if match
+        )
+        rows = []
+        size = 0
+        for seq in seqs:
+            offset = 0
+            with open(self._path(seq), "rb") as file:
+                for line in file:
+                    if line.endswith(b"\n"):
+                        try:
+                            ts, kind, name = json.loads(line)[:3]
+                        except (ValueError, TypeError):
+                            _LOGGER.debug(f"跳过损坏的历史记录：{self._path(seq)}@{offset}")
+                        else:
+                            rows.append((ts, kind, name, (seq, offset, len(line))))
+                    offset += len(line)
+            size = offset
+            if offset and not line.endswith(b"\n"):
+                # 末行不完整（写入时中断），之后写入新文件
+                size = self._max_bytes
+        return rows, seqs[-1] if seqs else 0, size
+
+    @callback
+    def _index(self, ts: float, kind: str, name: Optional[str], location: _Location) -> None:
+        # 系统时间回拨时沿用上一条的时间，保证索引有序
+        if self._ts and ts < self._ts[-1]:
+            ts = self._ts[-1]
+        self._ts.append(ts)
+        self._locations.append(location)
+        self._kinds.append(sys.intern(kind))
+        if kind == TRANSITION_POLICY and name is not None:
+            self._by_group.setdefault(sys.intern(name), []).append(
+                self._dropped + len(self._ts) - 1
+            )
+
+    @callback
+    def _prune(self, oldest_seq: int) -> None:
+        """删除已轮转出去的文件对应的索引"""
+        count = 0
+        while count < len(self._locations) and self._locations[count][0] < oldest_seq:
+            count += 1
+        if not count:
+            return
+        del self._ts[:count]
+        del self._locations[:count]
+        del self._kinds[:count]
+        self._dropped += count
+        for group in list(self._by_group):
+            ids = self._by_group[group]
+            del ids[: bisect.bisect_left(ids, self._dropped)]
+            if not ids:
+                del self._by_group[group]
+
+    # ------------------------------ 写入 ------------------------------
+    @callback
+    def async_append(self, transition: SurgeTransition, ts: Optional[float] = None) -> None:
+        """追加一条变化（非阻塞：同一轮的多条变化在执行器中批量写入）"""
+        self._pending.append((time.time() if ts is None else ts, transition))
+        if self._writer is None:
+            self._writer = self.hass.async_create_background_task(
+                self._async_write_pending(), name=f"surge_history_{self._entry_id}"
+            )
+
+    async def _async_write_pending(self) -> None:
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                lines = [_encode(ts, transition) for ts, transition in batch]
+                try:
+                    locations, oldest_seq = await self.hass.async_add_executor_job(
+                        self._write, lines
+                    )
+                except OSError as exc:
+                    _LOGGER.error(f"写入Surge状态变化历史失败: {str(exc)}")
+                    continue
+                for (ts, transition), location in zip(batch, locations):
+                    self._index(ts, transition.kind, transition.name, location)
+                self._prune(oldest_seq)
+        finally:
+            self._writer = None
+
+    def _write(self, lines: List[bytes]) -> Tuple[List[_Location], int]:
+        """逐行检查文件大小：写满时在批次中途轮转，返回每行的位置和最早保留的文件序号"""
+        os.makedirs(self._directory, exist_ok=True)
+        locations = []
+        chunk: List[bytes] = []
+        for line in lines:
+            # 单行超过上限时独占一个文件，其余情况文件都不超过max_bytes
+            if self._size and self._size + len(line) > self._max_bytes:
+                self._append_file(chunk)
+                chunk = []
+                self._rotate()
+            locations.append((self._seq, self._size, len(line)))
+            self._size += len(line)
+            chunk.append(line)
+        self._append_file(chunk)
+        return locations, max(self._seq - self._max_files + 1, 0)
+
+    def _append_file(self, chunk: List[bytes]) -> None:
+        if chunk:
+            with open(self._path(self._seq), "ab") as file:
+                file.write(b"".join(chunk))
+
+    def _rotate(self) -> None:
+        self._seq += 1
+        self._size = 0
+        stale = self._path(self._seq - self._max_files)
+        if self._seq >= self._max_files and os.path.exists(stale):
+            os.remove(stale)
+
+    async def async_close(self) -> None:
+        """等待未写入的记录落盘（卸载配置项时调用）"""
+        if self._writer is not None:
+            await self._writer
+
+    # ------------------------------ 查询 ------------------------------
+    async def async_query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        kind: Optional[str] = None,
+        group: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """按时间范围（含首尾）/类型/策略组查询，按时间顺序返回，超过limit时返回最新的limit条"""
+        lo = bisect.bisect_left(self._ts, start) if start is not None else 0
+        hi = bisect.bisect_right(self._ts, end) if end is not None else len(self._ts)
+        if group is not None:
+            # 策略组只对应policy类型的记录
+            ids = self._by_group.get(group, []) if kind in (None, TRANSITION_POLICY) else []
+            first = bisect.bisect_left(ids, self._dropped + lo)
+            last = bisect.bisect_left(ids, self._dropped + hi)
+            positions = [i - self._dropped for i in ids[first:last]]
+        elif kind is not None:
+            positions = [i for i in range(lo, hi) if self._kinds[i] == kind]
+        else:
+            positions = list(range(lo, hi))
+        if limit is not None:
+            positions = positions[-limit:] if limit else []
+        locations = [self._locations[i] for i in positions]
+        if not locations:
+            return []
+        return await self.hass.async_add_executor_job(self._read, locations)
+
+    def _read(self, locations: List[_Location]) -> List[Dict[str, Any]]:
+        records = []
+        file = None
+        seq = None
+        try:
+            for location_seq, offset, length in locations:
+                if location_seq != seq:
+                    if file is not None:
+                        file.close()
+                    seq = location_seq
+                    try:
+                        file = open(self._path(seq), "rb")
+                    except FileNotFoundError:
+                        file = None  # 查询期间被轮转删除
+                if file is None:
+                    continue
+                file.seek(offset)
+                records.append(_decode(file.read(length)))
+        finally:
+            if file is not None:
+                file.close()
+        return records
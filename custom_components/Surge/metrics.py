@@ -0,0 +1,171 @@
+"""Surge API 请求统计（按接口族统计请求数、错误分类、延迟直方图和接收字节数）
+
+请求数、错误数、字节数自客户端创建起累计；延迟只统计最近LATENCY_WINDOW秒，
+分位数能反映设备当前的响应变慢，不会被长期累积的样本稀释。
+"""
+
+import bisect
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# 延迟直方图桶上界（毫秒），最后一个桶为溢出桶
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# 延迟统计窗口：按固定时长分槽，整槽过期丢弃
+LATENCY_SLOT_SECONDS = 60
+LATENCY_WINDOW_SLOTS = 5
+LATENCY_WINDOW = LATENCY_SLOT_SECONDS * LATENCY_WINDOW_SLOTS
+
+# 错误分类
+ERROR_AUTH = "auth"
+ERROR_4XX = "4xx"
+ERROR_5XX = "5xx"
+ERROR_CONNECTION = "connection"
+ERROR_TIMEOUT = "timeout"
+ERROR_OTHER = "other"
+ERROR_CLASSES = [ERROR_AUTH, ERROR_4XX, ERROR_5XX, ERROR_CONNECTION, ERROR_TIMEOUT, ERROR_OTHER]
+
+# 集成使用的接口族（endpoint的第一段路径）
+ENDPOINT_FAMILIES = ["profiles", "features", "outbound", "policy_groups", "traffic", "modules", "dns"]
+
+
+def endpoint_family(endpoint: str) -> str:
+    """接口族：如 policy_groups/Proxy → policy_groups"""
+    return endpoint.lstrip("/").split("/", 1)[0]
+
+
+class LatencyHistogram:
+    """固定桶延迟直方图（内存占用固定，不保存原始样本）"""
+
+    __slots__ = ("counts", "total", "min_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.min_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, latency_ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        if not self.total or latency_ms < self.min_ms:
+            self.min_ms = latency_ms
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+        self.total += 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if not other.total:
+            return
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.min_ms = min(self.min_ms, other.min_ms) if self.total else other.min_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.total += other.total
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """估算分位数（桶内线性插值，插值范围限制在观测到的最小/最大值之内）"""
+        if not self.total:
+            return None
+        rank = pct / 100 * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if not count or seen + count < rank:
+                seen += count
+                continue
+            if index == len(LATENCY_BUCKETS_MS):
+                return round(self.max_ms, 1)
+            lower = max(LATENCY_BUCKETS_MS[index - 1] if index else 0, self.min_ms)
+            upper = min(LATENCY_BUCKETS_MS[index], self.max_ms)
+            return round(lower + (upper - lower) * (rank - seen) / count, 1)
+        return round(self.max_ms, 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "min": round(self.min_ms, 1),
+            "max": round(self.max_ms, 1),
+            "samples": self.total,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class WindowedLatency:
+    """最近LATENCY_WINDOW秒的延迟分布（每槽一个直方图，过期的槽整体丢弃）"""
+
+    __slots__ = ("_slots",)
+
+    def __init__(self) -> None:
+        self._slots: Deque[Tuple[int, LatencyHistogram]] = deque()
+
+    def _expire(self, slot: int) -> None:
+        while self._slots and self._slots[0][0] <= slot - LATENCY_WINDOW_SLOTS:
+            self._slots.popleft()
+
+    def add(self, latency_ms: float, now: Optional[float] = None) -> None:
+        slot = int((time.monotonic() if now is None else now) // LATENCY_SLOT_SECONDS)
+        if not self._slots or self._slots[-1][0] != slot:
+            self._expire(slot)
+            self._slots.append((slot, LatencyHistogram()))
+        self._slots[-1][1].add(latency_ms)
+
+    def snapshot(self, now: Optional[float] = None) -> LatencyHistogram:
+        """合并窗口内各槽，返回当前窗口的直方图"""
+        self._expire(int((time.monotonic() if now is None else now) // LATENCY_SLOT_SECONDS))
+        merged = LatencyHistogram()
+        for _, histogram in self._slots:
+            merged.merge(histogram)
+        return merged
+
+
+class EndpointStats:
+    """单个接口族的统计"""
+
+    __slots__ = ("requests", "errors", "bytes_received", "latency")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors: Dict[str, int] = dict.fromkeys(ERROR_CLASSES, 0)
+        self.bytes_received = 0
+        self.latency = WindowedLatency()  # 只统计最近LATENCY_WINDOW秒
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": dict(self.errors),
+            "bytes_received": self.bytes_received,
+            "latency_ms": {"window_s": LATENCY_WINDOW, **self.latency.snapshot().as_dict()},
+        }
+
+
+class SurgeAPIMetrics:
+    """SurgeAPIClient的请求统计（自客户端创建起累计）"""
+
+    def __init__(self) -> None:
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def record(
+        self,
+        endpoint: str,
+        latency: float,
+        bytes_received: int,
+        error: Optional[str] = None,
+    ) -> None:
+        family = endpoint_family(endpoint)
+        stats = self.endpoints.get(family)
+        if stats is None:
+            stats = self.endpoints[family] = EndpointStats()
+        stats.requests += 1
+        stats.bytes_received += bytes_received
+        stats.latency.add(latency * 1000)
+        if error is not None:
+            stats.errors[error] += 1
+
+    def get(self, family: str) -> EndpointStats:
+        """获取接口族统计（尚无请求时返回空统计）"""
+        return self.endpoints.get(family) or EndpointStats()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {family: stats.as_dict() for family, stats in sorted(self.endpoints.items())}
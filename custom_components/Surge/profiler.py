@@ -0,0 +1,155 @@
+"""刷新周期采样分析器（诊断事件循环卡顿是否由Surge集成引起）
+
+后台线程定期采样事件循环线程的调用栈，按栈中的帧归类：
+- network_wait：事件循环空闲，等待网络IO（selector）
+- json_decode：JSON解析
+- state_write：实体状态写入（async_write_ha_state / 状态机）
+- integration：本集成自身代码
+- other：aiohttp、HA核心等其他代码
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional
+
+CATEGORY_NETWORK_WAIT = "network_wait"
+CATEGORY_JSON = "json_decode"
+CATEGORY_STATE_WRITE = "state_write"
+CATEGORY_INTEGRATION = "integration"
+CATEGORY_OTHER = "other"
+CATEGORIES = [
+    CATEGORY_NETWORK_WAIT,
+    CATEGORY_JSON,
+    CATEGORY_STATE_WRITE,
+    CATEGORY_INTEGRATION,
+    CATEGORY_OTHER,
+]
+
+DEFAULT_SAMPLE_INTERVAL = 0.002  # 采样间隔（秒）
+MAX_STACK_DEPTH = 64  # 每次采样最多回溯的帧数
+
+_INTEGRATION_DIR = os.path.dirname(os.path.abspath(__file__))
+_SEP = os.sep
+_STATE_WRITE_FUNCTIONS = {
+    "async_write_ha_state",
+    "_async_write_ha_state",
+    "_async_write_ha_state_from_call_soon_threadsafe",
+    "async_set",
+    "async_set_internal",
+}
+# 本集成的JSON解析入口：orjson是C扩展，没有Python帧，解析耗时只能记在调用它的帧上
+_JSON_FUNCTIONS = {"decode_json"}
+
+
+def _classify(frame: FrameType) -> str:
+    """按调用栈归类一次采样（内层优先）"""
+    filename = frame.f_code.co_filename
+    if filename.endswith(f"{_SEP}selectors.py"):
+        return CATEGORY_NETWORK_WAIT
+
+    category = CATEGORY_OTHER
+    depth = 0
+    current: Optional[FrameType] = frame
+    while current is not None and depth < MAX_STACK_DEPTH:
+        code = current.f_code
+        filename = code.co_filename
+        if f"{_SEP}json{_SEP}" in filename or "orjson" in filename or code.co_name == "json":
+            return CATEGORY_JSON
+        if code.co_name in _JSON_FUNCTIONS and filename.startswith(_INTEGRATION_DIR):
+            return CATEGORY_JSON
+        if code.co_name in _STATE_WRITE_FUNCTIONS:
+            return CATEGORY_STATE_WRITE
+        if category == CATEGORY_OTHER and filename.startswith(_INTEGRATION_DIR):
+            category = CATEGORY_INTEGRATION
+        current = current.f_back
+        depth += 1
+    return category
+
+
+class RefreshProfiler:
+    """事件循环线程的采样分析器（start/stop需在事件循环线程中调用）"""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        self._interval = interval
+        self._target_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.categories: Counter = Counter()
+        self.hotspots: Counter = Counter()  # 本集成内最内层帧（文件:函数:行）
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def start(self) -> None:
+        self._target_thread = threading.get_ident()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="surge_refresh_profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止采样（采样线程在一个采样间隔内退出）"""
+        self._stop.set()
+        self.elapsed = time.perf_counter() - self.started
+
+    def join(self) -> None:
+        """等待采样线程退出（阻塞，需在执行器中调用）"""
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._target_thread)
+            if frame is None:
+                continue
+            category = _classify(frame)
+            self.categories[category] += 1
+            self.samples += 1
+            if category == CATEGORY_INTEGRATION:
+                self._record_hotspot(frame)
+
+    def _record_hotspot(self, frame: Optional[FrameType]) -> None:
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename.startswith(_INTEGRATION_DIR):
+                name = os.path.basename(code.co_filename)
+                self.hotspots[f"{name}:{code.co_name}:{frame.f_lineno}"] += 1
+                return
+            frame = frame.f_back
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各类别的采样占比与估算耗时"""
+        total = self.samples or 1
+        return {
+            category: {
+                "samples": self.categories[category],
+                "percent": round(self.categories[category] * 100 / total, 1),
+                "seconds": round(self.elapsed * self.categories[category] / total, 3),
+            }
+            for category in CATEGORIES
+        }
+
+    def report(self, title: str, cycle_times: List[float]) -> str:
+        """生成文本报告"""
+        lines = [
+            title,
+            f"采样间隔: {self._interval * 1000:.1f}ms  采样数: {self.samples}  "
+            f"总耗时: {self.elapsed:.3f}s",
+            "",
+            "每轮刷新耗时(ms): " + ", ".join(f"{t * 1000:.1f}" for t in cycle_times),
+            "",
+            f"{'类别':<16}{'采样':>8}{'占比%':>8}{'估算秒':>10}",
+        ]
+        for category, stats in self.summary().items():
+            lines.append(
+                f"{category:<16}{stats['samples']:>8}{stats['percent']:>8}{stats['seconds']:>10}"
+            )
+        lines.extend(["", "本集成代码热点（采样数）:"])
+        for location, count in self.hotspots.most_common(20):
+            lines.append(f"{count:>8}  {location}")
+        return "\n".join(lines) + "\n"
@@ -6,88 +6,240 @@ from typing import Dict, Optional
 from homeassistant.components.sensor import SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from homeassistant.const import UnitOfDataVolume
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.const import UnitOfDataVolume, UnitOfTime
 
 from .const import (
     DOMAIN,
     API_CLIENT,
     CONF_UPDATE_INTERVAL,
+    DNS_CACHE,
+    UPDATE_COORDINATOR,
 )
-from .__init__ import get_common_device_info
+from . import get_common_device_info, get_fleet_scheduler
+from .coordinator import KEY_TRAFFIC, SurgeDataCoordinator
+from .dns import SurgeDNSCache, SurgeDNSSnapshot
+from .entity import SurgeEntity
+from .metrics import ENDPOINT_FAMILIES, LatencyHistogram
 from .surge_api import SurgeAPIClient, SurgeAPIError
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class SurgeTrafficSensor(SensorEntity):
+class SurgeTrafficSensor(SurgeEntity, SensorEntity):
+    def __init__(self, coordinator: SurgeDataCoordinator, entry: ConfigEntry):
+        super().__init__(coordinator, entry, [KEY_TRAFFIC])
+
+        # 实体基础属性
+        self._attr_unique_id = f"{entry.entry_id}_traffic_sensor"
+        self._attr_name = "Surge 总流量"
+        self._attr_unit_of_measurement = UnitOfDataVolume.MEGABYTES  # 单位：MB
+        self._attr_state_class = SensorStateClass.TOTAL  # 累计型传感器
+
+    def _snapshot_available(self) -> bool:
+        return self.snapshot.traffic is not None
+
+    @property
+    def state(self) -> Optional[float]:
+        """返回总流量（MB）"""
+        return self.snapshot.traffic.total
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, float]:
+        """额外属性：显示上传/下载流量"""
+        traffic = self.snapshot.traffic
+        return {
+            "上传流量(MB)": traffic.upload,
+            "下载流量(MB)": traffic.download,
+        }
+
+
+# ------------------------------ API请求统计（诊断） ------------------------------
+class SurgeAPIStatsSensor(SensorEntity):
+    """接口族请求统计的诊断传感器基类（默认禁用，每轮调度时刷新）"""
+
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _metric_key = ""  # 子类定义：unique_id中的统计项
+    _metric_name = ""  # 子类定义：显示名称前缀
+
     def __init__(
         self,
         hass: HomeAssistant,
         entry: ConfigEntry,
         api_client: SurgeAPIClient,
         update_interval: int,
+        family: str,
     ):
         self.hass = hass
         self.entry = entry
         self._api_client = api_client
         self._update_interval = update_interval
-        self._traffic_data: Dict[str, float] = {
-            "upload": 0.0,
-            "download": 0.0,
-            "total": 0.0,
-        }
+        self._family = family  # 接口族（如policy_groups）
 
-        # 实体基础属性
-        self._attr_unique_id = f"{entry.entry_id}_traffic_sensor"
-        self._attr_name = "Surge 总流量"
-        self._attr_unit_of_measurement = UnitOfDataVolume.MEGABYTES  # 单位：MB
-        self._attr_state_class = SensorStateClass.TOTAL  # 累计型传感器
-        self._attr_device_info = get_common_device_info(entry)  # 统一设备信息
-        self._attr_available = True
-
-        # 初始化更新协调器
-        self._coordinator = DataUpdateCoordinator(
-            self.hass,
-            _LOGGER,
-            name=self._attr_name,
-            update_method=self._async_update_data,
-            update_interval=self._update_interval,
+        self._attr_unique_id = f"{entry.entry_id}_api_{self._metric_key}_{family}"
+        self._attr_name = f"{self._metric_name} - {family}"
+        self._attr_device_info = get_common_device_info(entry)
+
+    async def async_added_to_hass(self) -> None:
+        """实体添加到HA时注册到共享调度器（统计数据在本地，无需请求API）"""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            get_fleet_scheduler(self.hass).async_register(
+                self.entry.entry_id, self._update_interval, self._async_refresh
+            )
         )
 
+    async def _async_refresh(self) -> None:
+        self.async_write_ha_state()
+
+
+class SurgeAPIRequestSensor(SurgeAPIStatsSensor):
+    """接口族累计请求数（属性：错误分类计数、接收字节数）"""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _metric_key = "requests"
+    _metric_name = "Surge API请求数"
+
+    @property
+    def native_value(self) -> int:
+        return self._api_client.metrics.get(self._family).requests
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, int]:
+        stats = self._api_client.metrics.get(self._family)
+        return {
+            **{f"errors_{name}": count for name, count in stats.errors.items()},
+            "bytes_received": stats.bytes_received,
+        }
+
+
+class SurgeAPILatencySensor(SurgeAPIStatsSensor):
+    """接口族最近5分钟的延迟p95（属性：p50/p99/最大值/样本数）"""
+
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _metric_key = "latency"
+    _metric_name = "Surge API延迟"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._latency = LatencyHistogram()
+
+    async def _async_refresh(self) -> None:
+        # 每轮取一次窗口快照，状态和属性来自同一份数据
+        self._latency = self._api_client.metrics.get(self._family).latency.snapshot()
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> Optional[float]:
+        return self._latency.percentile(95)
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Optional[float]]:
+        return {
+            "p50": self._latency.percentile(50),
+            "p99": self._latency.percentile(99),
+            "max": round(self._latency.max_ms, 1) if self._latency.total else None,
+            "samples": self._latency.total,
+        }
+
+
+# ------------------------------ DNS缓存 ------------------------------
+class SurgeDNSSensor(SensorEntity):
+    """DNS缓存传感器基类：读取缓存的DNS快照（过期后才重新拉取完整缓存）"""
+
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        dns_cache: SurgeDNSCache,
+        update_interval: int,
+    ):
+        self.hass = hass
+        self.entry = entry
+        self._dns_cache = dns_cache
+        self._update_interval = update_interval
+        self._snapshot: Optional[SurgeDNSSnapshot] = None
+        self._failed = False  # 上一次获取是否失败
+        self._attr_device_info = get_common_device_info(entry)
+        self._attr_available = False
+
     async def async_added_to_hass(self) -> None:
-        """实体添加到HA时启动协调器"""
+        """实体添加到HA时获取一次快照，并注册到共享调度器"""
         await super().async_added_to_hass()
-        await self._coordinator.async_config_entry_first_refresh()
+        await self._async_refresh()
+        self.async_on_remove(
+            get_fleet_scheduler(self.hass).async_register(
+                self.entry.entry_id, self._update_interval, self._async_refresh
+            )
+        )
 
-    async def _async_update_data(self) -> None:
-        """从API刷新流量数据"""
+    async def _async_refresh(self) -> None:
         try:
-            self._traffic_data = await self._api_client.get_traffic()
+            snapshot = await self._dns_cache.async_get()
         except Exception as exc:
-            _LOGGER.error(f"更新流量数据失败: {str(exc)}")
-            self._attr_available = False
-        else:
+            if self._failed:
+                _LOGGER.debug(f"更新DNS缓存失败: {str(exc)}")
+                return
+            # 只在开始失败时记录错误（失败期间每轮重复的失败只记debug）
+            _LOGGER.error(f"更新DNS缓存失败: {str(exc)}")
+            self._failed = True
+            if self._attr_available:
+                self._attr_available = False
+                self.async_write_ha_state()
+            return
+        self._failed = False
+        # 快照未重新获取时无需写入状态
+        if snapshot is not self._snapshot or not self._attr_available:
+            self._snapshot = snapshot
             self._attr_available = True
+            self.async_write_ha_state()
+
+
+class SurgeDNSCacheSizeSensor(SurgeDNSSensor):
+    """DNS缓存条数（属性：本地映射数、各上游服务器的缓存条数）"""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, hass, entry, dns_cache, update_interval):
+        super().__init__(hass, entry, dns_cache, update_interval)
+        self._attr_unique_id = f"{entry.entry_id}_dns_cache_size"
+        self._attr_name = "Surge DNS缓存条数"
 
     @property
-    def state(self) -> Optional[float]:
-        """返回总流量（MB）"""
-        return self._traffic_data["total"]
+    def native_value(self) -> Optional[int]:
+        return self._snapshot.size if self._snapshot else None
 
     @property
-    def extra_state_attributes(self) -> Dict[str, float]:
-        """额外属性：显示上传/下载流量"""
-        return {
-            "上传流量(MB)": self._traffic_data["upload"],
-            "下载流量(MB)": self._traffic_data["download"],
-        }
+    def extra_state_attributes(self) -> Dict[str, object]:
+        if self._snapshot is None:
+            return {}
+        return {"local": self._snapshot.local_count, "servers": dict(self._snapshot.servers)}
+
+
+class SurgeDNSResolveTimeSensor(SurgeDNSSensor):
+    """DNS缓存记录的平均解析耗时（属性：最大值）"""
+
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, hass, entry, dns_cache, update_interval):
+        super().__init__(hass, entry, dns_cache, update_interval)
+        self._attr_unique_id = f"{entry.entry_id}_dns_resolve_time"
+        self._attr_name = "Surge DNS平均解析耗时"
 
     @property
-    def available(self) -> bool:
-        """返回实体是否可用"""
-        return self._attr_available
+    def native_value(self) -> Optional[float]:
+        return self._snapshot.avg_time_cost_ms if self._snapshot else None
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Optional[float]]:
+        return {"max": self._snapshot.max_time_cost_ms if self._snapshot else None}
 
 
 # ------------------------------ 平台注册入口 ------------------------------
@@ -100,10 +252,20 @@ async def async_setup_entry(
     # 从全局存储获取API客户端
     domain_data = hass.data[DOMAIN][entry.entry_id]
     api_client = domain_data[API_CLIENT]
+    coordinator = domain_data[UPDATE_COORDINATOR]
     update_interval = entry.data[CONF_UPDATE_INTERVAL]
 
     # 创建并注册流量传感器实体
-    async_add_entities(
-        [SurgeTrafficSensor(hass, entry, api_client, update_interval)],
-        update_before_add=True,
-    )
+    entities = [SurgeTrafficSensor(coordinator, entry)]
+
+    # DNS缓存传感器（共用一个DNS缓存快照）
+    dns_cache = domain_data[DNS_CACHE]
+    entities.append(SurgeDNSCacheSizeSensor(hass, entry, dns_cache, update_interval))
+    entities.append(SurgeDNSResolveTimeSensor(hass, entry, dns_cache, update_interval))
+
+    # API请求统计诊断传感器（默认禁用）
+    for family in ENDPOINT_FAMILIES:
+        entities.append(SurgeAPIRequestSensor(hass, entry, api_client, update_interval, family))
+        entities.append(SurgeAPILatencySensor(hass, entry, api_client, update_interval, family))
+
+    async_add_entities(entities)
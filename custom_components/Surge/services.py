@@ -0,0 +1,287 @@
+"""Surge Integration 服务（诊断工具）"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .capture import DEFAULT_MAX_ENTRIES, SurgeTrafficCapture
+from .const import (
+    API_CLIENT,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_CYCLES,
+    ATTR_DOMAIN,
+    ATTR_DURATION,
+    ATTR_END,
+    ATTR_GROUP,
+    ATTR_KIND,
+    ATTR_LIMIT,
+    ATTR_MAX_ENTRIES,
+    ATTR_REFRESH,
+    ATTR_SAMPLE_INTERVAL,
+    ATTR_START,
+    CAPTURE_CANCEL,
+    CAPTURE_DIR,
+    DEFAULT_CAPTURE_DURATION,
+    DEFAULT_HISTORY_LIMIT,
+    DEFAULT_PROFILE_CYCLES,
+    DNS_CACHE,
+    DOMAIN,
+    FLEET_SCHEDULER,
+    HISTORY_LOG,
+    PROFILE_DIR,
+    SERVICE_DNS_LOOKUP,
+    SERVICE_FLUSH_DNS,
+    SERVICE_PROFILE_REFRESH,
+    SERVICE_QUERY_HISTORY,
+    SERVICE_START_CAPTURE,
+    SERVICE_STOP_CAPTURE,
+)
+from .coordinator import TRANSITION_EVENTS
+from .profiler import DEFAULT_SAMPLE_INTERVAL, RefreshProfiler
+
+_LOGGER = logging.getLogger(__name__)
+
+START_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_DURATION, default=DEFAULT_CAPTURE_DURATION): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=86400)
+        ),
+        vol.Optional(ATTR_MAX_ENTRIES, default=DEFAULT_MAX_ENTRIES): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+STOP_CAPTURE_SCHEMA = vol.Schema({vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string})
+PROFILE_REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CYCLES, default=DEFAULT_PROFILE_CYCLES): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_SAMPLE_INTERVAL, default=DEFAULT_SAMPLE_INTERVAL * 1000): vol.All(
+            vol.Coerce(float), vol.Range(min=0.5, max=100)
+        ),  # 毫秒
+    }
+)
+DNS_LOOKUP_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_DOMAIN): cv.string,
+        vol.Optional(ATTR_REFRESH, default=False): cv.boolean,
+    }
+)
+FLUSH_DNS_SCHEMA = vol.Schema({vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string})
+QUERY_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,  # 省略时查询所有配置项
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_KIND): vol.In(list(TRANSITION_EVENTS)),
+        vol.Optional(ATTR_GROUP): cv.string,
+        vol.Optional(ATTR_LIMIT, default=DEFAULT_HISTORY_LIMIT): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100000)
+        ),
+    }
+)
+
+
+def get_entry_data(hass: HomeAssistant, entry_id: str) -> Dict[str, Any]:
+    """获取已加载配置项的全局存储（未加载时抛出校验错误）"""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if not isinstance(entry_data, dict) or API_CLIENT not in entry_data:
+        raise ServiceValidationError(f"Surge配置项{entry_id}不存在或未加载")
+    return entry_data
+
+
+async def async_finish_capture(hass: HomeAssistant, entry_id: str) -> Optional[str]:
+    """停止录制并写入文件，返回文件路径（未在录制时返回None）"""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if not isinstance(entry_data, dict):
+        return None
+    if cancel := entry_data.pop(CAPTURE_CANCEL, None):
+        cancel()
+    capture = entry_data[API_CLIENT].stop_capture()
+    if capture is None:
+        return None
+
+    path = hass.config.path(
+        CAPTURE_DIR, f"{entry_id}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+    )
+
+    def _write() -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        capture.write(path)
+
+    await hass.async_add_executor_job(_write)
+    _LOGGER.info(f"Surge API流量录制已保存：{path}（{len(capture.entries)}条）")
+    return path
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """注册Surge服务（DOMAIN级别，只注册一次）"""
+
+    async def _async_start_capture(call: ServiceCall) -> None:
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        entry_data = get_entry_data(hass, entry_id)
+        api_client = entry_data[API_CLIENT]
+        if api_client.capturing:
+            raise ServiceValidationError(f"Surge配置项{entry_id}正在录制中")
+
+        api_client.start_capture(SurgeTrafficCapture(call.data[ATTR_MAX_ENTRIES]))
+
+        async def _async_auto_stop(_now: Any) -> None:
+            entry_data.pop(CAPTURE_CANCEL, None)
+            await async_finish_capture(hass, entry_id)
+
+        entry_data[CAPTURE_CANCEL] = async_call_later(
+            hass, call.data[ATTR_DURATION], _async_auto_stop
+        )
+        _LOGGER.info(f"开始录制Surge API流量（配置项：{entry_id}）")
+
+    async def _async_stop_capture(call: ServiceCall) -> ServiceResponse:
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        get_entry_data(hass, entry_id)
+        path = await async_finish_capture(hass, entry_id)
+        if path is None:
+            raise ServiceValidationError(f"Surge配置项{entry_id}未在录制")
+        return {"path": path}
+
+    async def _async_profile_refresh(call: ServiceCall) -> ServiceResponse:
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        get_entry_data(hass, entry_id)
+        scheduler = hass.data[DOMAIN][FLEET_SCHEDULER]
+        profiler = RefreshProfiler(call.data[ATTR_SAMPLE_INTERVAL] / 1000)
+
+        # 在分析器下连续执行N轮刷新（与调度器触发的刷新完全相同）；
+        # 先等正在执行的定时刷新结束，分析期间定时刷新跳过，避免两者重叠
+        cycle_times = []
+        async with scheduler.async_hold_entry(entry_id) as refresh:
+            profiler.start()
+            try:
+                for _ in range(call.data[ATTR_CYCLES]):
+                    started = time.perf_counter()
+                    await refresh()
+                    cycle_times.append(time.perf_counter() - started)
+            finally:
+                profiler.stop()
+
+        path = hass.config.path(
+            PROFILE_DIR, f"{entry_id}_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+
+        def _write() -> None:
+            profiler.join()  # 等采样线程退出后再汇总
+            report = profiler.report(
+                f"Surge刷新周期采样分析（配置项：{entry_id}，{len(cycle_times)}轮）", cycle_times
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(report)
+
+        await hass.async_add_executor_job(_write)
+        _LOGGER.info(f"Surge刷新周期采样分析报告已保存：{path}")
+        return {
+            "path": path,
+            "cycle_times_ms": [round(t * 1000, 1) for t in cycle_times],
+            "summary": profiler.summary(),
+        }
+
+    async def _async_dns_lookup(call: ServiceCall) -> ServiceResponse:
+        dns_cache = get_entry_data(hass, call.data[ATTR_CONFIG_ENTRY_ID])[DNS_CACHE]
+        # 默认复用有效期内的快照，refresh为true时才重新拉取完整缓存
+        snapshot = await dns_cache.async_get(force=call.data[ATTR_REFRESH])
+        return {
+            "domain": call.data[ATTR_DOMAIN],
+            "records": [record.as_dict() for record in snapshot.lookup(call.data[ATTR_DOMAIN])],
+            "cache_size": snapshot.size,
+            "snapshot_age": round(time.monotonic() - snapshot.fetched_at, 1),
+        }
+
+    async def _async_flush_dns(call: ServiceCall) -> None:
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        await get_entry_data(hass, entry_id)[DNS_CACHE].async_flush()
+        _LOGGER.info(f"已清空Surge DNS缓存（配置项：{entry_id}）")
+
+    async def _async_query_history(call: ServiceCall) -> ServiceResponse:
+        if ATTR_CONFIG_ENTRY_ID in call.data:
+            entry_ids = [call.data[ATTR_CONFIG_ENTRY_ID]]
+            get_entry_data(hass, entry_ids[0])
+        else:
+            entry_ids = [
+                entry_id
+                for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+                if isinstance(entry_data, dict) and HISTORY_LOG in entry_data
+            ]
+        # 不带时区的时间按HA配置的时区解释（as_timestamp会按系统时区解释）
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        limit = call.data[ATTR_LIMIT]
+
+        transitions = []
+        for entry_id in entry_ids:
+            records = await hass.data[DOMAIN][entry_id][HISTORY_LOG].async_query(
+                start=dt_util.as_utc(start).timestamp() if start else None,
+                end=dt_util.as_utc(end).timestamp() if end else None,
+                kind=call.data.get(ATTR_KIND),
+                group=call.data.get(ATTR_GROUP),
+                limit=limit,
+            )
+            transitions.extend({"config_entry_id": entry_id, **record} for record in records)
+        # 多个配置项合并后按时间排序，只保留最新的limit条
+        transitions.sort(key=lambda record: record["ts"])
+        transitions = transitions[-limit:]
+        for record in transitions:
+            record["time"] = dt_util.utc_from_timestamp(record.pop("ts")).isoformat()
+        return {"transitions": transitions}
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_CAPTURE, _async_start_capture, schema=START_CAPTURE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_CAPTURE,
+        _async_stop_capture,
+        schema=STOP_CAPTURE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE_REFRESH,
+        _async_profile_refresh,
+        schema=PROFILE_REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_DNS_LOOKUP,
+        _async_dns_lookup,
+        schema=DNS_LOOKUP_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_FLUSH_DNS, _async_flush_dns, schema=FLUSH_DNS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_HISTORY,
+        _async_query_history,
+        schema=QUERY_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -1,15 +1,41 @@
 """Surge HTTP API 客户端（适配Config Flow）"""
 
 import aiohttp
+import asyncio
+import contextlib
+import json
 import logging
+import time
 from typing import Dict, List, Optional, Any
 
+try:  # 可选：更快的JSON解析（HA环境自带）
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DEFAULT_PORT
+from .capture import SurgeTrafficCapture
+from .const import DEFAULT_PORT, REQUEST_TIMEOUT
+from .metrics import (
+    ERROR_4XX,
+    ERROR_5XX,
+    ERROR_AUTH,
+    ERROR_CONNECTION,
+    ERROR_OTHER,
+    ERROR_TIMEOUT,
+    SurgeAPIMetrics,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def decode_json(body: bytes) -> Any:
+    """解析JSON响应体（优先使用orjson）"""
+    return _json_loads(body)
+
 
 class SurgeAPIError(HomeAssistantError):
     """Surge API请求异常基类（供Config Flow捕获）"""
@@ -24,6 +50,10 @@ class SurgeAPIClient:
         session: aiohttp.ClientSession = None,
         use_https: bool = False,
         verify_ssl: bool = True,
+        request_semaphore: Optional[asyncio.Semaphore] = None,
+        max_concurrent_requests: Optional[int] = None,
+        request_timeout: float = REQUEST_TIMEOUT,
+        quiet: bool = False,
     ):
         self._host = host
         self._port = port
@@ -33,12 +63,39 @@ class SurgeAPIClient:
         self._verify_ssl = verify_ssl  # 控制SSL证书验证
         self._base_url = self._get_base_url()
         self._headers = {"X-Key": self._api_key, "Accept": "application/json"}
+        # 并发请求限制：全局（由多设备调度器共享）+ 单设备；未传入时不限制
+        self._request_semaphore = request_semaphore or contextlib.nullcontext()
+        self._device_semaphore = (
+            asyncio.Semaphore(max_concurrent_requests)
+            if max_concurrent_requests
+            else contextlib.nullcontext()
+        )
+        self.request_timeout = aiohttp.ClientTimeout(total=request_timeout)
+        # 请求失败的日志级别（连接探测时失败是预期内的，只记debug）
+        self._log_error = _LOGGER.debug if quiet else _LOGGER.error
+        self._capture: Optional[SurgeTrafficCapture] = None  # 流量录制（诊断模式）
+        self.metrics = SurgeAPIMetrics()  # 按接口族的请求统计（诊断传感器/诊断下载）
 
     def _get_base_url(self) -> str:
         """生成API基础URL（根据HTTPS配置切换协议）"""
         scheme = "https" if self._use_https else "http"
         return f"{scheme}://{self._host}:{self._port}/v1"
 
+    # ------------------------------ 流量录制 ------------------------------
+    @property
+    def capturing(self) -> bool:
+        """是否正在录制请求/响应"""
+        return self._capture is not None
+
+    def start_capture(self, capture: SurgeTrafficCapture) -> None:
+        """开始录制（后续所有请求的响应和耗时写入capture）"""
+        self._capture = capture
+
+    def stop_capture(self) -> Optional[SurgeTrafficCapture]:
+        """停止录制，返回录制结果（未在录制时返回None）"""
+        capture, self._capture = self._capture, None
+        return capture
+
     async def _request(
         self,
         method: str,
@@ -48,6 +105,23 @@ class SurgeAPIClient:
     ) -> Dict[str, Any]:
         """通用API请求封装（含错误处理）"""
         url = f"{self._base_url}/{endpoint.lstrip('/')}"
+        # 先占单设备名额再占全局名额：排队等待本设备的请求不占用全局名额
+        async with self._device_semaphore, self._request_semaphore:
+            return await self._send(method, endpoint, url, data, params)
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        data: Optional[Dict],
+        params: Optional[Dict],
+    ) -> Dict[str, Any]:
+        """发送单个请求并解析响应"""
+        capture = self._capture
+        started = time.monotonic()
+        status, body = 0, None  # 连接失败时记录为状态码0
+        error: Optional[str] = None  # 错误分类（用于请求统计）
         try:
             async with self._session.request(
                 method,
@@ -55,32 +129,50 @@ class SurgeAPIClient:
                 headers=self._headers,
                 json=data,
                 params=params,
-                verify=self._verify_ssl,  # 传入SSL验证配置
+                timeout=self.request_timeout,
+                ssl=None if self._verify_ssl else False,  # 传入SSL验证配置（None=默认校验）
             ) as response:
+                status = response.status
+                body = await response.read()  # 读取后会缓存，不影响下方解析
+
                 # 处理HTTP状态码
                 if response.status == 401:
-                    _LOGGER.error("Surge API 认证失败（无效X-Key）")
+                    error = ERROR_AUTH
+                    self._log_error("Surge API 认证失败（无效X-Key）")
                     raise ValueError("Invalid API Key")  # 会被Config Flow转为InvalidAuth
                 if response.status >= 500:
-                    _LOGGER.error(f"Surge API 服务器错误（状态码：{response.status}）")
+                    error = ERROR_5XX
+                    self._log_error(f"Surge API 服务器错误（状态码：{response.status}）")
                     raise SurgeAPIError(f"Server error: {response.status}")
                 if 400 <= response.status < 500:
-                    _LOGGER.error(f"Surge API 请求参数错误（状态码：{response.status}）")
+                    error = ERROR_4XX
+                    self._log_error(f"Surge API 请求参数错误（状态码：{response.status}）")
                     raise SurgeAPIError(f"Bad request: {response.status}")
 
-                # 解析响应（处理非JSON响应）
+                # 解析响应（只读取一次响应体；非UTF-8的响应体同样按非JSON处理）
                 try:
-                    return await response.json()
-                except aiohttp.ContentTypeError:
-                    _LOGGER.error("Surge API 返回非JSON数据")
+                    return decode_json(body) if body else {}
+                except ValueError:
+                    error = ERROR_OTHER
+                    self._log_error("Surge API 返回非JSON数据")
                     raise SurgeAPIError("Invalid API response (not JSON)")
 
         except aiohttp.ClientConnectionError as exc:
-            _LOGGER.error(f"无法连接Surge设备（{self._host}:{self._port}）")
+            error = ERROR_TIMEOUT if isinstance(exc, asyncio.TimeoutError) else ERROR_CONNECTION
+            self._log_error(f"无法连接Surge设备（{self._host}:{self._port}）")
             raise ConnectionError from exc  # 会被Config Flow转为CannotConnect
+        except (ValueError, SurgeAPIError):
+            raise  # 认证失败/状态码错误已分类，直接抛出（不再二次包装）
         except Exception as exc:
-            _LOGGER.error(f"API请求失败（{endpoint}）: {str(exc)}")
+            if error is None:
+                error = ERROR_TIMEOUT if isinstance(exc, asyncio.TimeoutError) else ERROR_OTHER
+            self._log_error(f"API请求失败（{endpoint}）: {str(exc)}")
             raise SurgeAPIError from exc
+        finally:
+            latency = time.monotonic() - started
+            self.metrics.record(endpoint, latency, len(body) if body else 0, error)
+            if capture is not None:
+                capture.record(method, endpoint, status, latency, body)
 
     # ------------------------------ 配置管理 ------------------------------
     async def get_profiles(self) -> List[str]:
@@ -111,6 +203,26 @@ class SurgeAPIClient:
         """设置指定功能的启用状态"""
         await self._request("POST", f"features/{feature}", data={"enabled": enabled})
 
+    # ------------------------------ 模块 ------------------------------
+    async def get_modules(self) -> Dict[str, bool]:
+        """获取所有模块及其启用状态（一次请求）"""
+        data = await self._request("GET", "modules")
+        enabled = set(data.get("enabled", []))
+        return {name: name in enabled for name in data.get("available", [])}
+
+    async def set_modules(self, changes: Dict[str, bool]) -> None:
+        """批量启用/禁用模块（{模块名: 是否启用}，一次请求）"""
+        await self._request("POST", "modules", data=changes)
+
+    # ------------------------------ DNS ------------------------------
+    async def get_dns_cache(self) -> Dict[str, Any]:
+        """获取DNS缓存及本地DNS映射（完整列表，数据量可能较大）"""
+        return await self._request("GET", "dns")
+
+    async def flush_dns(self) -> None:
+        """清空DNS缓存"""
+        await self._request("POST", "dns/flush")
+
     # ------------------------------ 流量监控 ------------------------------
     async def get_traffic(self) -> Dict[str, float]:
         """获取当前流量（上传/下载，单位：MB）"""
@@ -139,6 +251,14 @@ class SurgeAPIClient:
         data = await self._request("GET", "policy_groups")
         return data.get("groups", [])
 
+    async def get_policy_group(self, group_name: str) -> Dict[str, Any]:
+        """获取指定策略组的当前策略和全部可用策略（一次请求）"""
+        data = await self._request("GET", f"policy_groups/{group_name}")
+        return {
+            "current": data.get("current", "Unknown Policy"),
+            "policies": data.get("policies", []),
+        }
+
     async def get_policy_group_current_policy(self, group_name: str) -> Optional[str]:
         """获取指定策略组的当前生效策略"""
         data = await self._request("GET", f"policy_groups/{group_name}")
@@ -0,0 +1,84 @@
+"""API流量录制脱敏测试"""
+
+import json
+
+from custom_components.Surge.capture import SurgeTrafficCapture, redact_payload, redact_text
+
+SECRETS = [
+    "examplekey123",
+    "MIIKPAIBAzCCCgYGCSqGSIb3DQEHAaCCCfcEggnzMIIJ7zCCBF8GCSqGSIb3DQEHBqCCBFAwggRMAgEA",
+    "p12-pass phrase",
+    "alice",
+    "hunter2",
+    "bob",
+    "s3cr3t",
+    "ss-password",
+    "snell-psk-value",
+    "trojan-pass",
+    "9b5f2a71-3c7e-4f1d-8a6b-2d4e0f9c1b3a",
+    "wgPrivateKeyBase64Value=",
+    "opaque-token-value",
+]
+
+PROFILE = """[General]
+loglevel = notify
+http-api = examplekey123@0.0.0.0:6171
+http-api-tls = false
+dns-server = 223.5.5.5, 119.29.29.29
+
+[Proxy]
+Home = https, 1.2.3.4, 443, alice, hunter2
+Office = http, 10.0.0.2, 8080, bob, s3cr3t, skip-cert-verify=true
+Socks = socks5, 10.0.0.3, 1080
+SS = ss, ss.example.com, 8388, encrypt-method=aes-128-gcm, password=ss-password
+Snell = snell, snell.example.com, 6160, psk=snell-psk-value, version=4
+Trojan = trojan, trojan.example.com, 443, password=trojan-pass, sni=trojan.example.com
+VMess = vmess, vmess.example.com, 443, username=9b5f2a71-3c7e-4f1d-8a6b-2d4e0f9c1b3a, tls=true
+
+[WireGuard home]
+private-key = wgPrivateKeyBase64Value=
+self-ip = 10.8.0.2
+
+[Script]
+api-token = opaque-token-value
+
+[MITM]
+hostname = *.example.com
+ca-passphrase = p12-pass phrase
+ca-p12 = MIIKPAIBAzCCCgYGCSqGSIb3DQEHAaCCCfcEggnzMIIJ7zCCBF8GCSqGSIb3DQEHBqCCBFAwggRMAgEA
+"""
+
+
+def test_redact_profile_removes_every_secret():
+    redacted = redact_text(PROFILE)
+    for secret in SECRETS:
+        assert secret not in redacted, secret
+
+
+def test_redact_profile_keeps_length_and_structure():
+    redacted = redact_text(PROFILE)
+    assert len(redacted) == len(PROFILE)
+    assert "Home = https, 1.2.3.4, 443, *****, *******" in redacted
+    assert "Socks = socks5, 10.0.0.3, 1080" in redacted
+    assert "skip-cert-verify=true" in redacted
+    assert "hostname = *.example.com" in redacted
+    assert "dns-server = 223.5.5.5, 119.29.29.29" in redacted
+
+
+def test_redact_payload_profile_response():
+    payload = {"profile_name": "Home", "profile": PROFILE, "api_key": "abc"}
+    redacted = redact_payload(payload)
+    assert redacted["profile_name"] == "Home"
+    assert redacted["api_key"] == "***"
+    for secret in SECRETS:
+        assert secret not in redacted["profile"]
+
+
+def test_capture_records_redacted_body():
+    capture = SurgeTrafficCapture()
+    body = json.dumps({"profile": PROFILE}).encode()
+    capture.record("GET", "/profiles/current", 200, 0.01, body)
+    entry = capture.entries[0]
+    assert entry["e"] == "profiles/current"
+    assert entry["n"] == len(body)
+    assert "hunter2" not in entry["b"]["profile"]
@@ -0,0 +1,133 @@
+"""设备快照对比测试（变化键、状态变化）"""
+
+from types import MappingProxyType
+
+from custom_components.Surge.coordinator import (
+    KEY_CURRENT_PROFILE,
+    KEY_OUTBOUND,
+    KEY_PROFILES,
+    KEY_TRAFFIC,
+    TRANSITION_FEATURE,
+    TRANSITION_OUTBOUND,
+    TRANSITION_POLICY,
+    TRANSITION_PROFILE,
+    SurgePolicyGroupState,
+    SurgeSnapshot,
+    SurgeTraffic,
+    _InternPool,
+    feature_key,
+    group_key,
+    iter_transitions,
+    module_key,
+)
+
+POOL = _InternPool()
+
+
+def _snapshot(
+    current_profile="Home",
+    outbound="rule",
+    traffic=(1.0, 2.0),
+    features=None,
+    groups=None,
+    modules=None,
+    profiles=("Home", "Away"),
+):
+    if groups is None:
+        groups = {"Proxy": ("HK", ("HK", "JP")), "Media": ("JP", ("HK", "JP"))}
+    return SurgeSnapshot(
+        profiles=POOL.intern_tuple(profiles),
+        current_profile=current_profile,
+        outbound_mode=outbound,
+        traffic=SurgeTraffic(traffic[0], traffic[1], traffic[0] + traffic[1]) if traffic else None,
+        features=MappingProxyType(features if features is not None else {"mitm": False}),
+        policy_groups=MappingProxyType(
+            {
+                name: SurgePolicyGroupState(state[0], POOL.intern_tuple(state[1]))
+                if state
+                else None
+                for name, state in groups.items()
+            }
+        ),
+        modules=MappingProxyType(modules) if modules is not None else None,
+    )
+
+
+def test_first_snapshot_reports_all_keys():
+    snapshot = _snapshot(modules={"Block Ads": True})
+    assert snapshot.changed_keys(None) == snapshot.keys() == {
+        KEY_PROFILES,
+        KEY_CURRENT_PROFILE,
+        KEY_OUTBOUND,
+        KEY_TRAFFIC,
+        feature_key("mitm"),
+        group_key("Proxy"),
+        group_key("Media"),
+        module_key("Block Ads"),
+    }
+
+
+def test_unchanged_snapshot_has_no_changed_keys():
+    assert _snapshot().changed_keys(_snapshot()) == frozenset()
+
+
+def test_changed_keys_are_precise():
+    previous = _snapshot(modules={"A": True, "B": False})
+    current = _snapshot(
+        traffic=(1.5, 2.0),
+        groups={"Proxy": ("JP", ("HK", "JP")), "Media": ("JP", ("HK", "JP"))},
+        modules={"A": True, "B": True},
+    )
+    assert current.changed_keys(previous) == {KEY_TRAFFIC, group_key("Proxy"), module_key("B")}
+
+
+def test_added_and_removed_groups_and_failed_modules():
+    previous = _snapshot(modules={"A": True})
+    current = _snapshot(groups={"Proxy": ("HK", ("HK", "JP")), "New": ("X", ("X",))}, modules=None)
+    assert current.changed_keys(previous) == {
+        group_key("Media"),
+        group_key("New"),
+        module_key("A"),
+    }
+
+
+def test_transitions_carry_old_and_new_values():
+    previous = _snapshot(features={"mitm": False})
+    current = _snapshot(
+        current_profile="Away",
+        outbound="direct",
+        features={"mitm": True},
+        groups={"Proxy": ("JP", ("HK", "JP")), "Media": ("JP", ("HK", "JP"))},
+    )
+    transitions = {
+        (kind, name, old, new)
+        for _, kind, name, old, new in iter_transitions(
+            previous, current, current.changed_keys(previous)
+        )
+    }
+    assert transitions == {
+        (TRANSITION_PROFILE, None, "Home", "Away"),
+        (TRANSITION_OUTBOUND, None, "rule", "direct"),
+        (TRANSITION_FEATURE, "mitm", False, True),
+        (TRANSITION_POLICY, "Proxy", "HK", "JP"),
+    }
+
+
+def test_fetch_failures_are_not_transitions():
+    previous = _snapshot()
+    failed = _snapshot(
+        current_profile=None,
+        outbound=None,
+        features={"mitm": None},
+        groups={"Proxy": None, "Media": ("JP", ("HK", "JP"))},
+    )
+    assert list(iter_transitions(previous, failed, failed.changed_keys(previous))) == []
+    assert list(iter_transitions(failed, previous, previous.changed_keys(failed))) == []
+
+
+def test_policy_list_change_without_selection_change_is_not_a_transition():
+    previous = _snapshot()
+    current = _snapshot(groups={"Proxy": ("HK", ("HK", "JP", "US")), "Media": ("JP", ("HK", "JP"))})
+    changed = current.changed_keys(previous)
+    assert changed == {group_key("Proxy")}
+    assert list(iter_transitions(previous, current, changed)) == []
@@ -0,0 +1,95 @@
+"""连接探测测试（不连接真实设备：替换探测用的API客户端）"""
+
+import asyncio
+
+import pytest
+
+from custom_components.Surge import discovery
+from custom_components.Surge.const import CONF_USE_HTTPS, CONF_VERIFY_SSL
+
+
+def _fake_client(outcomes):
+    """outcomes: (use_https, verify_ssl) → (延迟秒, 异常或None)"""
+
+    class FakeClient:
+        def __init__(self, *, use_https, verify_ssl, **kwargs):
+            assert kwargs["quiet"] is True
+            self._outcome = outcomes[(use_https, verify_ssl)]
+
+        async def get_profiles(self):
+            delay, error = self._outcome
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return []
+
+    return FakeClient
+
+
+def _probe(monkeypatch, outcomes, preferred=None):
+    monkeypatch.setattr(discovery, "SurgeAPIClient", _fake_client(outcomes))
+    return asyncio.run(
+        discovery.async_probe_connection(None, "192.0.2.1", 6171, "key", preferred)
+    )
+
+
+def test_prefers_verified_https_even_if_unverified_answers_first(monkeypatch):
+    result = _probe(
+        monkeypatch,
+        {
+            (False, True): (0, ConnectionError()),
+            (True, True): (0.05, None),
+            (True, False): (0, None),
+        },
+        preferred=(True, False),
+    )
+    assert result == {CONF_USE_HTTPS: True, CONF_VERIFY_SSL: True}
+
+
+def test_falls_back_to_unverified_https(monkeypatch):
+    result = _probe(
+        monkeypatch,
+        {
+            (False, True): (0, ConnectionError()),
+            (True, True): (0.01, ConnectionError("self-signed")),
+            (True, False): (0, None),
+        },
+    )
+    assert result == {CONF_USE_HTTPS: True, CONF_VERIFY_SSL: False}
+
+
+def test_unverified_https_beats_plain_http(monkeypatch):
+    result = _probe(
+        monkeypatch,
+        {
+            (False, True): (0, None),
+            (True, True): (0, ConnectionError("self-signed")),
+            (True, False): (0.05, None),
+        },
+        preferred=(True, False),
+    )
+    assert result == {CONF_USE_HTTPS: True, CONF_VERIFY_SSL: False}
+
+
+def test_plain_http(monkeypatch):
+    result = _probe(
+        monkeypatch,
+        {
+            (False, True): (0.02, None),
+            (True, True): (0, ConnectionError()),
+            (True, False): (0, ConnectionError()),
+        },
+    )
+    assert result == {CONF_USE_HTTPS: False, CONF_VERIFY_SSL: True}
+
+
+def test_auth_failure(monkeypatch):
+    with pytest.raises(discovery.ProbeAuthError):
+        _probe(
+            monkeypatch,
+            {
+                (False, True): (0, ValueError("Invalid API Key")),
+                (True, True): (0, ConnectionError()),
+                (True, False): (0, ConnectionError()),
+            },
+        )
@@ -0,0 +1,79 @@
+"""DNS缓存快照测试（复用快照、失败缓存、并发共享请求）"""
+
+import asyncio
+
+import pytest
+
+from custom_components.Surge.dns import SurgeDNSCache
+
+DNS_RESPONSE = {
+    "dnsCache": [
+        {"domain": "www.apple.com.", "data": ["17.253.144.10"], "server": "udp://223.5.5.5", "timeCost": 0.02},
+        {"domain": "apple.com", "data": ["17.253.144.11"], "server": "udp://223.5.5.5", "timeCost": 0.04},
+        {"domain": "example.org", "data": ["93.184.216.34"], "server": "udp://119.29.29.29"},
+    ],
+    "local": [{"domain": "router.lan", "data": "192.168.1.1"}],
+}
+
+
+class FakeClient:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    async def get_dns_cache(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return DNS_RESPONSE
+
+    async def flush_dns(self):
+        pass
+
+
+def test_snapshot_is_reused_and_shared():
+    async def run():
+        client = FakeClient()
+        cache = SurgeDNSCache(client, max_age=300)
+        first, second = await asyncio.gather(cache.async_get(), cache.async_get())
+        assert first is second
+        assert await cache.async_get() is first
+        assert client.calls == 1
+        assert first.size == 3 and first.local_count == 1
+        assert first.avg_time_cost_ms == 30.0 and first.max_time_cost_ms == 40.0
+        assert {r.domain for r in first.lookup("Apple.com.")} == {"www.apple.com", "apple.com"}
+        await cache.async_get(force=True)
+        assert client.calls == 2
+
+    asyncio.run(run())
+
+
+def test_failure_is_cached_for_concurrent_and_later_callers():
+    async def run():
+        client = FakeClient(error=ConnectionError("unsupported"))
+        cache = SurgeDNSCache(client, max_age=300)
+        results = await asyncio.gather(cache.async_get(), cache.async_get(), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        with pytest.raises(ConnectionError):
+            await cache.async_get()
+        assert client.calls == 1
+
+        # 强制刷新不受失败缓存影响，成功后清除失败
+        client.error = None
+        assert (await cache.async_get(force=True)).size == 3
+        assert client.calls == 2
+
+    asyncio.run(run())
+
+
+def test_failure_expires_with_max_age():
+    async def run():
+        client = FakeClient(error=ConnectionError())
+        cache = SurgeDNSCache(client, max_age=0)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await cache.async_get()
+        assert client.calls == 2
+
+    asyncio.run(run())
@@ -0,0 +1,148 @@
+"""状态变化历史日志测试（轮转、索引裁剪、重建索引、查询）"""
+
+import asyncio
+import os
+
+from custom_components.Surge.coordinator import (
+    TRANSITION_OUTBOUND,
+    TRANSITION_POLICY,
+    TRANSITION_PROFILE,
+    SurgeTransition,
+)
+from custom_components.Surge.history import SurgeHistoryLog
+
+
+class FakeHass:
+    """只提供历史日志用到的执行器和后台任务接口"""
+
+    async def async_add_executor_job(self, target, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+    def async_create_background_task(self, target, name):
+        return asyncio.get_running_loop().create_task(target, name=name)
+
+
+def _transition(i):
+    if i % 2:
+        return SurgeTransition(TRANSITION_POLICY, f"Group {i % 4}", f"old{i}", f"new{i}", "external")
+    return SurgeTransition(TRANSITION_PROFILE, None, f"old{i}", f"new{i}", "homeassistant")
+
+
+async def _fill(path, count, max_bytes=2000, max_files=3):
+    log = SurgeHistoryLog(FakeHass(), str(path), "entry", max_bytes=max_bytes, max_files=max_files)
+    await log.async_load()
+    for i in range(count):
+        log.async_append(_transition(i), ts=1000 + i)
+    await log.async_close()
+    return log
+
+
+def test_append_and_query(tmp_path):
+    async def run():
+        log = await _fill(tmp_path, 20, max_bytes=1 << 20)
+        assert log.size == 20
+        records = await log.async_query(start=1005, end=1009)
+        assert [r["ts"] for r in records] == [1005, 1006, 1007, 1008, 1009]
+        assert records[0] == {
+            "ts": 1005,
+            "kind": TRANSITION_POLICY,
+            "name": "Group 1",
+            "old": "old5",
+            "new": "new5",
+            "source": "external",
+        }
+        group = await log.async_query(group="Group 3")
+        assert [r["ts"] for r in group] == [1003, 1007, 1011, 1015, 1019]
+        assert await log.async_query(group="Group 3", kind=TRANSITION_PROFILE) == []
+        profiles = await log.async_query(kind=TRANSITION_PROFILE, limit=2)
+        assert [r["ts"] for r in profiles] == [1016, 1018]
+
+    asyncio.run(run())
+
+
+def test_rotation_prunes_index_with_deleted_files(tmp_path):
+    async def run():
+        log = await _fill(tmp_path, 300)
+        files = sorted(os.listdir(tmp_path))
+        assert len(files) == 3
+        # 同一批次内也按行轮转：每个文件都不超过上限
+        assert all(os.path.getsize(tmp_path / name) <= 2000 for name in files)
+        oldest_seq = min(int(name.split(".")[1]) for name in files)
+
+        # 索引中只剩仍在磁盘上的记录，且都能读出
+        records = await log.async_query()
+        assert len(records) == log.size < 300
+        assert records[-1]["ts"] == 1299
+        assert records[0]["ts"] == 1300 - log.size
+        assert all(location[0] >= oldest_seq for location in log._locations)
+
+        # 按策略组查询与全量查询后过滤的结果一致（绝对编号在裁剪后仍正确）
+        for name in ("Group 1", "Group 3"):
+            expected = [r for r in records if r["name"] == name]
+            assert await log.async_query(group=name) == expected
+            ranged = await log.async_query(group=name, start=1250, end=1280)
+            assert ranged == [r for r in expected if 1250 <= r["ts"] <= 1280]
+
+    asyncio.run(run())
+
+
+def test_rotation_across_batches(tmp_path):
+    async def run():
+        log = SurgeHistoryLog(FakeHass(), str(tmp_path), "entry", max_bytes=2000, max_files=3)
+        await log.async_load()
+        for i in range(300):
+            log.async_append(_transition(i), ts=1000 + i)
+            if i % 7 == 6:
+                await log.async_close()  # 每7条一批
+        await log.async_close()
+        files = sorted(os.listdir(tmp_path))
+        assert len(files) == 3
+        assert all(os.path.getsize(tmp_path / name) <= 2000 for name in files)
+        records = await log.async_query()
+        assert len(records) == log.size and records[-1]["ts"] == 1299
+
+    asyncio.run(run())
+
+
+def test_reload_rebuilds_same_index(tmp_path):
+    async def run():
+        log = await _fill(tmp_path, 150)
+        reloaded = SurgeHistoryLog(FakeHass(), str(tmp_path), "entry", max_bytes=2000, max_files=3)
+        await reloaded.async_load()
+        assert reloaded.size == log.size
+        assert await reloaded.async_query(group="Group 1") == await log.async_query(group="Group 1")
+
+    asyncio.run(run())
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    async def run():
+        log = await _fill(tmp_path, 5, max_bytes=1 << 20)
+        with open(os.path.join(tmp_path, "entry.0.log"), "ab") as file:
+            file.write(b'[1999,"pol')  # 写入时中断
+
+        reloaded = SurgeHistoryLog(FakeHass(), str(tmp_path), "entry")
+        await reloaded.async_load()
+        assert reloaded.size == log.size == 5
+        reloaded.async_append(
+            SurgeTransition(TRANSITION_OUTBOUND, None, "rule", "direct", "external"), ts=2000
+        )
+        await reloaded.async_close()
+        assert os.path.exists(os.path.join(tmp_path, "entry.1.log"))
+        records = await reloaded.async_query(start=1500)
+        assert [(r["ts"], r["new"]) for r in records] == [(2000, "direct")]
+
+    asyncio.run(run())
+
+
+def test_clock_going_backwards_keeps_index_sorted(tmp_path):
+    async def run():
+        log = SurgeHistoryLog(FakeHass(), str(tmp_path), "entry")
+        await log.async_load()
+        for ts in (1000, 1010, 1005, 1020):
+            log.async_append(_transition(1), ts=ts)
+        await log.async_close()
+        assert list(log._ts) == sorted(log._ts)
+        assert len(await log.async_query(start=1000, end=1020)) == 4
+
+    asyncio.run(run())
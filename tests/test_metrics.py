@@ -0,0 +1,54 @@
+"""API请求统计测试"""
+
+from custom_components.Surge.metrics import (
+    LATENCY_SLOT_SECONDS,
+    LATENCY_WINDOW,
+    LatencyHistogram,
+    SurgeAPIMetrics,
+    WindowedLatency,
+)
+
+
+def test_percentile_single_sample_is_exact():
+    histogram = LatencyHistogram()
+    histogram.add(3.0)
+    assert histogram.percentile(50) == 3.0
+    assert histogram.percentile(99) == 3.0
+
+
+def test_percentile_stays_within_observed_range():
+    histogram = LatencyHistogram()
+    for latency in (30, 40, 45):
+        histogram.add(latency)
+    for pct in (1, 50, 95, 99):
+        assert 30 <= histogram.percentile(pct) <= 45
+
+
+def test_percentile_empty():
+    assert LatencyHistogram().percentile(95) is None
+
+
+def test_window_drops_old_samples():
+    latency = WindowedLatency()
+    for _ in range(1000):
+        latency.add(5, now=0)
+    latency.add(900, now=LATENCY_WINDOW - 1)
+    assert latency.snapshot(now=LATENCY_WINDOW - 1).total == 1001
+
+    # 早期的快速样本过期后，分位数只反映最近的慢响应
+    later = LATENCY_WINDOW + LATENCY_SLOT_SECONDS
+    latency.add(800, now=later)
+    snapshot = latency.snapshot(now=later)
+    assert snapshot.total == 2
+    assert snapshot.percentile(50) >= 500
+
+
+def test_counters_are_lifetime():
+    metrics = SurgeAPIMetrics()
+    metrics.record("policy_groups/Proxy", 0.01, 100)
+    metrics.record("policy_groups", 0.02, 50, error="5xx")
+    stats = metrics.get("policy_groups")
+    assert stats.requests == 2
+    assert stats.bytes_received == 150
+    assert stats.errors["5xx"] == 1
+    assert metrics.get("traffic").requests == 0
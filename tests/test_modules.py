@@ -0,0 +1,61 @@
+"""模块开关合并提交测试"""
+
+import asyncio
+
+from custom_components.Surge import coordinator as coordinator_module
+from custom_components.Surge.coordinator import SurgeDataCoordinator
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    async def set_modules(self, changes):
+        self.calls.append(dict(changes))
+
+
+class FakeHass:
+    def __init__(self, loop):
+        self.loop = loop
+
+
+def _coordinator(client):
+    # 只测试合并逻辑，不经过DataUpdateCoordinator的初始化
+    coordinator = SurgeDataCoordinator.__new__(SurgeDataCoordinator)
+    coordinator.hass = FakeHass(asyncio.get_running_loop())
+    coordinator.api_client = client
+    coordinator._pending_modules = {}
+    coordinator._modules_flushed = None
+    coordinator.refreshes = 0
+
+    async def async_refresh():
+        coordinator.refreshes += 1
+
+    coordinator.async_refresh = async_refresh
+    return coordinator
+
+
+def test_concurrent_toggles_are_merged(monkeypatch):
+    timers = []
+    monkeypatch.setattr(
+        coordinator_module,
+        "async_call_later",
+        lambda hass, delay, action: timers.append(action),
+    )
+
+    async def scenario():
+        client = FakeClient()
+        coordinator = _coordinator(client)
+        toggles = asyncio.gather(
+            coordinator.async_set_module("Ads", True),
+            coordinator.async_set_module("Trackers", False),
+            coordinator.async_set_module("Ads", False),
+        )
+        await asyncio.sleep(0)  # 让三个调用都进入合并窗口
+        assert len(timers) == 1
+        await timers[0](None)
+        await toggles
+        assert client.calls == [{"Ads": False, "Trackers": False}]
+        assert coordinator.refreshes == 1
+
+    asyncio.run(scenario())
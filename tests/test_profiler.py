@@ -0,0 +1,23 @@
+"""刷新周期采样分析器的归类测试"""
+
+import sys
+
+from custom_components.Surge.profiler import CATEGORY_JSON, CATEGORY_OTHER, _classify
+from custom_components.Surge.surge_api import decode_json
+
+
+def test_decode_json_counts_as_json(monkeypatch):
+    """orjson没有Python帧：在解析函数内采样时归类为json_decode而不是integration"""
+    categories = []
+
+    def fake_loads(body):
+        categories.append(_classify(sys._getframe()))
+        return {}
+
+    monkeypatch.setattr("custom_components.Surge.surge_api._json_loads", fake_loads)
+    decode_json(b"{}")
+    assert categories == [CATEGORY_JSON]
+
+
+def test_foreign_frame_counts_as_other():
+    assert _classify(sys._getframe()) == CATEGORY_OTHER
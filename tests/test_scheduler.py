@@ -0,0 +1,134 @@
+"""多设备共享调度器的错峰计划测试"""
+
+import asyncio
+import random
+
+from custom_components.Surge import _EntrySchedule
+
+
+def _run(schedule, cycles, jitter_ratio=0.1, late=0.0):
+    """模拟定时器：按next_delay依次触发，返回每次触发的时刻"""
+    rng = random.Random(0)
+    now = schedule.origin
+    fired = [now]
+    for _ in range(cycles):
+        now += schedule.next_delay(now, rng.uniform(-jitter_ratio, jitter_ratio)) + late
+        fired.append(now)
+    return fired
+
+
+def test_jitter_does_not_accumulate():
+    schedule = _EntrySchedule(30, origin=12.0)
+    fired = _run(schedule, 1000)
+    for k, when in enumerate(fired):
+        # 每一轮都在自己的网格时刻±10%以内（随机游走会远远偏离）
+        assert abs(when - (12.0 + k * 30)) <= 3.0 + 1e-9
+
+
+def test_phases_stay_apart():
+    first = _run(_EntrySchedule(30, origin=0.0), 500)
+    second = _run(_EntrySchedule(30, origin=15.0), 500)
+    for a, b in zip(first[1:], second[1:]):
+        assert 15 - 6 <= b - a <= 15 + 6
+
+
+def test_missed_cycles_are_skipped():
+    schedule = _EntrySchedule(30, origin=0.0)
+    # 事件循环卡顿100秒后才触发：下一轮落在网格上，而不是连续补跑
+    delay = schedule.next_delay(100.0, 0.0)
+    assert schedule.cycle == 4
+    assert delay == 20.0
+
+
+def test_client_is_released_by_acquire_key(monkeypatch):
+    asyncio.run(_check_release_by_acquire_key(monkeypatch))
+
+
+async def _check_release_by_acquire_key(monkeypatch):
+    import custom_components.Surge as surge
+    from custom_components.Surge.const import (
+        CONF_API_KEY,
+        CONF_HOST,
+        CONF_PORT,
+        CONF_UPDATE_INTERVAL,
+        CONF_USE_HTTPS,
+        CONF_VERIFY_SSL,
+    )
+
+    monkeypatch.setattr(surge, "async_get_clientsession", lambda hass: None)
+    scheduler = surge.SurgeFleetScheduler(hass=None)
+    data = {
+        CONF_HOST: "192.0.2.1",
+        CONF_PORT: 6171,
+        CONF_API_KEY: "old",
+        CONF_USE_HTTPS: False,
+        CONF_VERIFY_SSL: True,
+        CONF_UPDATE_INTERVAL: 30,
+    }
+    key, client = scheduler.async_acquire_client(data)
+    other_key, other = scheduler.async_acquire_client(data)
+    assert other is client and other_key == key
+
+    # 配置修改后entry.data变了：仍按获取时的键释放
+    data[CONF_API_KEY] = "new"
+    scheduler.async_release_client(key)
+    scheduler.async_release_client(other_key)
+    assert scheduler._clients == {} and scheduler._client_refs == {}
+
+
+def test_manual_refresh_waits_for_scheduled_cycle(monkeypatch):
+    import custom_components.Surge as surge
+
+    timers = []
+    def fake_call_later(hass, delay, action):
+        timers.append(action)
+        return lambda: None
+
+    monkeypatch.setattr(surge, "async_call_later", fake_call_later)
+
+    class FakeHass:
+        def __init__(self, loop):
+            self.loop = loop
+            self.tasks = []
+
+        def async_create_background_task(self, coro, name):
+            task = self.loop.create_task(coro)
+            self.tasks.append(task)
+            return task
+
+    async def scenario():
+        hass = FakeHass(asyncio.get_running_loop())
+        scheduler = surge.SurgeFleetScheduler(hass)
+        release = asyncio.Event()
+        active = 0
+        peak = 0
+        calls = 0
+
+        async def refresh():
+            nonlocal active, peak, calls
+            calls += 1
+            active += 1
+            peak = max(peak, active)
+            await release.wait()
+            active -= 1
+
+        scheduler.async_register("entry", 30, refresh)
+        timers.pop()(None)  # 定时刷新开始并卡住
+        await asyncio.sleep(0)
+        manual = asyncio.ensure_future(scheduler.async_refresh_entry("entry"))
+        await asyncio.sleep(0)
+        assert calls == 1  # 手动刷新等待定时刷新结束
+
+        release.set()
+        await manual
+        await asyncio.gather(*hass.tasks)
+        assert calls == 2 and peak == 1
+
+        # 手动独占期间定时刷新跳过
+        release.clear()
+        async with scheduler.async_hold_entry("entry"):
+            timers.pop()(None)
+            await asyncio.sleep(0)
+        assert calls == 2 and len(hass.tasks) == 1
+
+    asyncio.run(scenario())
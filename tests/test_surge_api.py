@@ -0,0 +1,61 @@
+"""SurgeAPIClient 响应解析与错误分类测试"""
+
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from custom_components.Surge.surge_api import SurgeAPIClient, SurgeAPIError
+
+RESPONSES = {
+    "outbound": (200, b'{"mode":"rule"}'),
+    "features/mitm": (200, b'{"nested":{"enabled":false},"enabled":true}'),
+    "profiles/current": (200, b'{"profile":"[General]\\nenabled = false\\n","profile_name":"Home"}'),
+    "traffic": (200, b'{"upload":\xff\xfe}'),
+    "profiles": (401, b""),
+}
+
+
+async def _call(method_name, *args):
+    """调用客户端方法，返回(结果或异常, 客户端)"""
+    async def handler(request):
+        status, body = RESPONSES[request.match_info["endpoint"]]
+        return web.Response(status=status, body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/v1/{endpoint:.*}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = SurgeAPIClient(host="127.0.0.1", port=port, api_key="k", session=session)
+            try:
+                return await getattr(client, method_name)(*args), client
+            except Exception as exc:
+                return exc, client
+    finally:
+        await runner.cleanup()
+
+
+def test_single_field_endpoints():
+    assert asyncio.run(_call("get_outbound_mode"))[0] == "rule"
+    assert asyncio.run(_call("get_current_profile"))[0] == "Home"
+
+
+def test_top_level_field_wins_over_nested():
+    assert asyncio.run(_call("get_feature_status", "mitm"))[0] is True
+
+
+def test_invalid_utf8_body_is_api_error():
+    error, client = asyncio.run(_call("get_traffic"))
+    assert isinstance(error, SurgeAPIError)
+    assert client.metrics.get("traffic").errors["other"] == 1
+
+
+def test_unauthorized_is_classified_as_auth():
+    error, client = asyncio.run(_call("get_profiles"))
+    assert isinstance(error, ValueError) and not isinstance(error, SurgeAPIError)
+    assert client.metrics.get("profiles").errors["auth"] == 1